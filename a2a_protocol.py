@@ -4,8 +4,11 @@ Core A2A protocol utilities and message handling
 """
 
 import json
+import orjson
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -17,7 +20,7 @@ class A2AMessageType(Enum):
     NOTIFICATION = "notification"
     ERROR = "error"
 
-@dataclass
+@dataclass(slots=True)
 class A2AMessage:
     """A2A Protocol Message Structure based on JSON-RPC 2.0"""
     jsonrpc: str = "2.0"
@@ -61,12 +64,25 @@ class AgentCard:
         if self.authentication_schemes is None:
             self.authentication_schemes = ["none", "bearer"]
 
+def create_pooled_session(pool_maxsize: int = 32, retries: int = 2) -> requests.Session:
+    """HTTP session that keeps connections to each agent alive between calls"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=retries, backoff_factor=0.1) if retries else 0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
 class A2AProtocolClient:
     """Client for communicating with A2A protocol agents"""
     
     def __init__(self, timeout: int = 30):
         self.timeout = timeout
-        self.session = requests.Session()
+        self.session = create_pooled_session()
         self.session.headers.update({
             "Content-Type": "application/json",
             "User-Agent": "A2A-Client/1.0"
@@ -83,12 +99,12 @@ class A2AProtocolClient:
         try:
             response = self.session.post(
                 f"{agent_endpoint}/a2a",
-                json=message.to_dict(),
+                data=orjson.dumps(message.to_dict()),
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 if "result" in result:
                     card_data = result["result"]
                     # Convert simple capability list to AgentCapability objects
@@ -125,12 +141,12 @@ class A2AProtocolClient:
         try:
             response = self.session.post(
                 f"{agent_endpoint}/a2a",
-                json=message.to_dict(),
+                data=orjson.dumps(message.to_dict()),
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 return {
                     "error": {
@@ -158,7 +174,7 @@ class A2AProtocolClient:
         try:
             response = self.session.post(
                 f"{agent_endpoint}/a2a",
-                json=message.to_dict(),
+                data=orjson.dumps(message.to_dict()),
                 timeout=self.timeout
             )
             return response.status_code == 200
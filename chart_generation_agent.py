@@ -7,6 +7,7 @@ import json
 import time
 import base64
 import io
+import threading
 from typing import Dict, Any
 from flask import Flask, request, jsonify
 from dataclasses import dataclass
@@ -16,6 +17,9 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.utils import PlotlyJSONEncoder
 
+from client_data_agent import ClientDataAgent
+from financial_data_agent import FinancialDataAgent
+
 @dataclass
 class A2AMessage:
     """A2A Protocol Message Structure"""
@@ -39,6 +43,10 @@ class ChartGenerationAgent:
         
         # Chart generation settings
         self.chart_config = {"responsive": True, "displayModeBar": True}
+        
+        # In-process client and market data sources for the portfolio pipeline, loaded on first use
+        self._pipeline_sources = None
+        self._pipeline_lock = threading.Lock()
     
     def setup_routes(self):
         """Setup A2A protocol endpoints"""
@@ -46,8 +54,18 @@ class ChartGenerationAgent:
         @self.app.route('/a2a', methods=['POST'])
         def handle_a2a_message():
             """Handle incoming A2A protocol messages"""
+            message = None
+            try:
+                # Decode once, straight from the raw request body
+                message_data = json.loads(request.get_data(cache=False))
+            except ValueError as e:
+                return jsonify({
+                    "jsonrpc": "2.0",
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
+                    "id": None
+                }), 400
+            
             try:
-                message_data = request.get_json()
                 message = A2AMessage(**message_data)
                 
                 if message.method == "get_capabilities":
@@ -94,7 +112,8 @@ class ChartGenerationAgent:
                 "generate_sector_allocation_chart",
                 "generate_performance_chart",
                 "generate_top_holdings_chart",
-                "generate_interactive_dashboard"
+                "generate_interactive_dashboard",
+                "run_portfolio_pipeline"
             ],
             "endpoint": self.endpoint,
             "version": "1.0"
@@ -129,6 +148,8 @@ class ChartGenerationAgent:
                 result = self.generate_top_holdings_chart(data)
             elif task_type == "generate_interactive_dashboard":
                 result = self.generate_interactive_dashboard(data)
+            elif task_type == "run_portfolio_pipeline":
+                result = self.run_portfolio_pipeline(data)
             else:
                 result = {"error": f"Unsupported task type: {task_type}"}
             
@@ -473,6 +494,45 @@ class ChartGenerationAgent:
             }
         }
     
+    def _get_pipeline_sources(self):
+        """Client and financial data agents used as in-process pipeline stages"""
+        if self._pipeline_sources is None:
+            with self._pipeline_lock:
+                if self._pipeline_sources is None:
+                    self._pipeline_sources = (ClientDataAgent(), FinancialDataAgent())
+        return self._pipeline_sources
+    
+    def run_portfolio_pipeline(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Aggregate client holdings, value them and chart the result in one task"""
+        chart_builders = {
+            "top_holdings": self.generate_top_holdings_chart,
+            "pie_chart": self.generate_portfolio_pie_chart
+        }
+        chart_type = data.get("chart_type", "top_holdings")
+        if chart_type not in chart_builders:
+            return {"error": f"Unsupported chart type: {chart_type}"}
+        
+        # Stages hand their results to each other directly instead of over A2A
+        client_agent, financial_agent = self._get_pipeline_sources()
+        holdings = client_agent.aggregate_holdings({})
+        portfolio_data = financial_agent.calculate_market_values({
+            "aggregated_holdings": holdings["aggregated_holdings"]
+        })
+        
+        chart_data = {"holdings": portfolio_data["holdings"]}
+        if "title" in data:
+            chart_data["title"] = data["title"]
+        
+        chart = chart_builders[chart_type](chart_data)
+        # Callers that only render the chart can skip shipping the intermediate stages back
+        if not data.get("include_data", True):
+            return {"chart": chart}
+        return {
+            "holdings": holdings,
+            "portfolio_data": portfolio_data,
+            "chart": chart
+        }
+    
     def start_server(self):
         """Start the A2A protocol server"""
         print(f"Starting ChartGeneration agent on port {self.port}")
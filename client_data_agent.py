@@ -6,11 +6,11 @@ Specialized agent for retrieving client information and portfolio holdings
 import json
 import time
 import random
-import pandas as pd
 import os
 from typing import Dict, Any
 from flask import Flask, request, jsonify
 from dataclasses import dataclass
+from csv_cache import load_csv
 
 @dataclass
 class A2AMessage:
@@ -39,30 +39,23 @@ class ClientDataAgent:
     def load_client_data(self) -> Dict[str, Any]:
         """Load client data from CSV files"""
         try:
-            # Load clients info
-            clients_df = pd.read_csv('data/clients.csv')
-            holdings_df = pd.read_csv('data/client_holdings.csv')
+            # Parsed frames are shared process-wide and re-read only when the files change
+            clients_df = load_csv('data/clients.csv', usecols=['client_id', 'client_name', 'account_value'])
+            holdings_df = load_csv('data/client_holdings.csv', usecols=['client_id', 'symbol', 'shares', 'avg_cost'])
             
-            portfolios = {}
+            # Group holdings in one pass instead of filtering the whole table per client
+            holdings_by_client = {
+                client_id: group[['symbol', 'shares', 'avg_cost']].to_dict('records')
+                for client_id, group in holdings_df.groupby('client_id', sort=False)
+            }
             
-            for _, client_row in clients_df.iterrows():
-                client_id = client_row['client_id']
-                
-                # Get holdings for this client
-                client_holdings = holdings_df[holdings_df['client_id'] == client_id]
-                holdings_list = []
-                
-                for _, holding_row in client_holdings.iterrows():
-                    holdings_list.append({
-                        "symbol": holding_row['symbol'],
-                        "shares": holding_row['shares'],
-                        "avg_cost": holding_row['avg_cost']
-                    })
-                
+            portfolios = {}
+            for client in clients_df.to_dict('records'):
+                client_id = client['client_id']
                 portfolios[client_id] = {
-                    "name": client_row['client_name'],
-                    "account_value": client_row['account_value'],
-                    "holdings": holdings_list
+                    "name": client['client_name'],
+                    "account_value": client['account_value'],
+                    "holdings": holdings_by_client.get(client_id, [])
                 }
             
             return portfolios
@@ -78,8 +71,18 @@ class ClientDataAgent:
         @self.app.route('/a2a', methods=['POST'])
         def handle_a2a_message():
             """Handle incoming A2A protocol messages"""
+            message = None
+            try:
+                # Decode once, straight from the raw request body
+                message_data = json.loads(request.get_data(cache=False))
+            except ValueError as e:
+                return jsonify({
+                    "jsonrpc": "2.0",
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
+                    "id": None
+                }), 400
+            
             try:
-                message_data = request.get_json()
                 message = A2AMessage(**message_data)
                 
                 if message.method == "get_capabilities":
@@ -0,0 +1,53 @@
+"""
+CSV Data Cache
+Process-wide cache of parsed reference CSVs, re-read only when a file changes
+"""
+
+import os
+import uuid
+import logging
+import functools
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def read_reference_csv(path: str, usecols: Sequence[str] = None) -> pd.DataFrame:
+    """Read a reference CSV through a Parquet sidecar that is rebuilt when the CSV changes"""
+    columns = list(usecols) if usecols else None
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return pd.read_csv(path, usecols=columns)
+    
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        return pq.read_table(parquet_path, columns=columns, memory_map=True).to_pandas()
+    
+    df = pd.read_csv(path)
+    try:
+        # Write then rename so concurrent agents never read a half-written file;
+        # a unique temp name keeps threads in one process from sharing it
+        tmp_path = f"{parquet_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        os.replace(tmp_path, parquet_path)
+    except Exception as e:
+        logger.warning("Could not cache %s as Parquet: %s", path, e)
+    return df[columns] if columns else df
+
+@functools.lru_cache(maxsize=32)
+def _load_csv(path: str, mtime: float, usecols: Optional[tuple], dtype: Optional[tuple]) -> pd.DataFrame:
+    """Parse a CSV once per (path, mtime, columns, dtypes)"""
+    df = read_reference_csv(path, usecols)
+    return df.astype(dict(dtype)) if dtype else df
+
+def load_csv(path: str, usecols: Sequence[str] = None, dtype: Dict[str, str] = None) -> pd.DataFrame:
+    """Parsed CSV shared by every agent in the process; treat the frame as read-only"""
+    return _load_csv(
+        path,
+        os.path.getmtime(path),
+        tuple(usecols) if usecols else None,
+        tuple(sorted(dtype.items())) if dtype else None
+    )
@@ -63,8 +63,18 @@ class DataProcessorAgent:
         @self.app.route('/a2a', methods=['POST'])
         def handle_a2a_message():
             """Handle incoming A2A protocol messages"""
+            message = None
+            try:
+                # Decode once, straight from the raw request body
+                message_data = json.loads(request.get_data(cache=False))
+            except ValueError as e:
+                return jsonify({
+                    "jsonrpc": "2.0",
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
+                    "id": None
+                }), 400
+            
             try:
-                message_data = request.get_json()
                 message = A2AMessage(**message_data)
                 
                 if message.method == "get_capabilities":
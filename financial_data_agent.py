@@ -5,12 +5,13 @@ Specialized agent for retrieving stock prices, market data, and financial produc
 
 import json
 import time
-import random
-import pandas as pd
+import threading
+import numpy as np
 import os
 from typing import Dict, Any
 from flask import Flask, request, jsonify
 from dataclasses import dataclass
+from csv_cache import load_csv
 
 @dataclass
 class A2AMessage:
@@ -29,42 +30,31 @@ class FinancialDataAgent:
         self.endpoint = f"http://localhost:{port}"
         self.active_tasks = {}
         
+        # Per-thread PCG64 generators for simulated price fluctuations
+        self._rng_local = threading.local()
+        
         # Initialize Flask app for A2A communication
         self.app = Flask(__name__)
         self.setup_routes()
         
         # Load market data and product info from CSV files
         self.market_data, self.product_info = self.load_market_data()
+        self.symbol_index, self.price_array = self.build_price_index(self.market_data)
     
     def load_market_data(self) -> tuple[Dict[str, Dict], Dict[str, Dict]]:
         """Load market data and product info from CSV files"""
         try:
-            # Load market data
-            market_df = pd.read_csv('data/market_data.csv')
-            product_df = pd.read_csv('data/product_info.csv')
-            
-            market_data = {}
-            product_info = {}
-            
-            # Process market data
-            for _, row in market_df.iterrows():
-                symbol = row['symbol']
-                market_data[symbol] = {
-                    "price": row['price'],
-                    "change": row['change'],
-                    "change_pct": row['change_pct'],
-                    "volume": row['volume'],
-                    "market_cap": row['market_cap'] if pd.notna(row['market_cap']) else None
-                }
+            # Parsed frames are shared process-wide and re-read only when the files change
+            market_df = load_csv('data/market_data.csv',
+                                 usecols=['symbol', 'price', 'change', 'change_pct', 'volume', 'market_cap'])
+            product_df = load_csv('data/product_info.csv', usecols=['symbol', 'sector', 'industry', 'category'])
             
-            # Process product info
-            for _, row in product_df.iterrows():
-                symbol = row['symbol']
-                product_info[symbol] = {
-                    "sector": row['sector'],
-                    "industry": row['industry'],
-                    "category": row['category']
-                }
+            # Build lookups column-wise; missing market caps become None
+            market_cap = market_df['market_cap'].astype(object).where(market_df['market_cap'].notna(), None)
+            market_data = (market_df.assign(market_cap=market_cap)
+                           .set_index('symbol')[['price', 'change', 'change_pct', 'volume', 'market_cap']]
+                           .to_dict('index'))
+            product_info = product_df.set_index('symbol')[['sector', 'industry', 'category']].to_dict('index')
             
             print(f"Loaded market data for {len(market_data)} symbols from CSV")
             print(f"Loaded product info for {len(product_info)} symbols from CSV")
@@ -92,14 +82,43 @@ class FinancialDataAgent:
         
         return market_data, product_info
     
+    def build_price_index(self, market_data: Dict[str, Dict]) -> tuple[Dict[str, int], np.ndarray]:
+        """Build a symbol->row index and a read-only price column for vectorized lookups"""
+        symbol_index = {symbol: i for i, symbol in enumerate(market_data)}
+        price_array = np.fromiter(
+            (float(info["price"]) for info in market_data.values()),
+            dtype=np.float64,
+            count=len(market_data)
+        )
+        # Reference data is shared by every request thread; never mutate it in place
+        price_array.setflags(write=False)
+        return symbol_index, price_array
+    
+    def _get_rng(self) -> np.random.Generator:
+        """Return the calling thread's random generator, creating it on first use"""
+        rng = getattr(self._rng_local, "rng", None)
+        if rng is None:
+            rng = self._rng_local.rng = np.random.default_rng()
+        return rng
+    
     def setup_routes(self):
         """Setup A2A protocol endpoints"""
         
         @self.app.route('/a2a', methods=['POST'])
         def handle_a2a_message():
             """Handle incoming A2A protocol messages"""
+            message = None
+            try:
+                # Decode once, straight from the raw request body
+                message_data = json.loads(request.get_data(cache=False))
+            except ValueError as e:
+                return jsonify({
+                    "jsonrpc": "2.0",
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
+                    "id": None
+                }), 400
+            
             try:
-                message_data = request.get_json()
                 message = A2AMessage(**message_data)
                 
                 if message.method == "get_capabilities":
@@ -213,7 +232,7 @@ class FinancialDataAgent:
         
         # Add small random fluctuation to simulate real-time data
         base_price = self.market_data[symbol]["price"]
-        fluctuation = random.uniform(-0.02, 0.02)  # ±2% fluctuation
+        fluctuation = self._get_rng().uniform(-0.02, 0.02)  # ±2% fluctuation
         current_price = base_price * (1 + fluctuation)
         
         return {
@@ -231,11 +250,12 @@ class FinancialDataAgent:
         symbols = data.get("symbols", list(self.market_data.keys()))
         
         market_data = {}
-        for symbol in symbols:
+        fluctuations = self._get_rng().uniform(-0.02, 0.02, len(symbols))
+        for i, symbol in enumerate(symbols):
             if symbol.upper() in self.market_data:
                 symbol_upper = symbol.upper()
                 base_price = self.market_data[symbol_upper]["price"]
-                fluctuation = random.uniform(-0.02, 0.02)
+                fluctuation = float(fluctuations[i])
                 current_price = base_price * (1 + fluctuation)
                 
                 market_data[symbol_upper] = {
@@ -258,14 +278,15 @@ class FinancialDataAgent:
         
         portfolio_values = []
         total_market_value = 0
+        fluctuations = self._get_rng().uniform(-0.02, 0.02, len(holdings))
         
-        for holding in holdings:
+        for i, holding in enumerate(holdings):
             symbol = holding.get("symbol", "").upper()
             shares = holding.get("shares", 0)
             
             if symbol in self.market_data:
                 base_price = self.market_data[symbol]["price"]
-                fluctuation = random.uniform(-0.02, 0.02)
+                fluctuation = float(fluctuations[i])
                 current_price = base_price * (1 + fluctuation)
                 market_value = shares * current_price
                 total_market_value += market_value
@@ -310,43 +331,43 @@ class FinancialDataAgent:
         """Calculate market values for aggregated holdings"""
         aggregated_holdings = data.get("aggregated_holdings", {})
         
-        market_values = {}
-        total_portfolio_value = 0
+        # Vectorized valuation over the read-only price column
+        symbols = [symbol for symbol in aggregated_holdings if symbol in self.symbol_index]
+        count = len(symbols)
+        idx = np.fromiter((self.symbol_index[s] for s in symbols), dtype=np.intp, count=count)
+        shares_arr = np.fromiter((aggregated_holdings[s].get("total_shares", 0) for s in symbols), dtype=np.float64, count=count)
+        fluctuations = self._get_rng().uniform(-0.02, 0.02, count)
+        current_prices = self.price_array[idx] * (1 + fluctuations)
+        mv_arr = shares_arr * current_prices
+        total_portfolio_value = float(mv_arr.sum())
         
-        for symbol, holding_data in aggregated_holdings.items():
-            if symbol in self.market_data:
-                shares = holding_data.get("total_shares", 0)
-                base_price = self.market_data[symbol]["price"]
-                fluctuation = random.uniform(-0.02, 0.02)
-                current_price = base_price * (1 + fluctuation)
-                market_value = shares * current_price
-                total_portfolio_value += market_value
-                
-                market_values[symbol] = {
-                    "symbol": symbol,
-                    "total_shares": shares,
-                    "current_price": round(current_price, 2),
-                    "market_value": round(market_value, 2),
-                    "avg_cost": holding_data.get("avg_cost", 0),
-                    "cost_basis": round(holding_data.get("total_cost_basis", 0), 2),
-                    "unrealized_gain_loss": round(market_value - holding_data.get("total_cost_basis", 0), 2),
-                    "client_count": holding_data.get("client_count", 0),
-                    "sector": self.product_info.get(symbol, {}).get("sector", "Unknown"),
-                    "industry": self.product_info.get(symbol, {}).get("industry", "Unknown")
-                }
-        
-        # Calculate percentages and sort by market value
-        sorted_holdings = []
-        for symbol, data in market_values.items():
-            data["portfolio_percentage"] = round((data["market_value"] / total_portfolio_value * 100), 2) if total_portfolio_value > 0 else 0
-            sorted_holdings.append(data)
+        holdings_list = []
+        for i, symbol in enumerate(symbols):
+            holding_data = aggregated_holdings[symbol]
+            market_value = float(mv_arr[i])
+            product = self.product_info.get(symbol, {})
+            
+            holdings_list.append({
+                "symbol": symbol,
+                "total_shares": holding_data.get("total_shares", 0),
+                "current_price": round(float(current_prices[i]), 2),
+                "market_value": round(market_value, 2),
+                "avg_cost": holding_data.get("avg_cost", 0),
+                "cost_basis": round(holding_data.get("total_cost_basis", 0), 2),
+                "unrealized_gain_loss": round(market_value - holding_data.get("total_cost_basis", 0), 2),
+                "client_count": holding_data.get("client_count", 0),
+                "sector": product.get("sector", "Unknown"),
+                "industry": product.get("industry", "Unknown"),
+                "portfolio_percentage": round((market_value / total_portfolio_value * 100), 2) if total_portfolio_value > 0 else 0
+            })
         
-        # Sort by market value descending
-        sorted_holdings.sort(key=lambda x: x["market_value"], reverse=True)
+        # Sort by market value descending with a C-level stable argsort
+        order = np.argsort(-mv_arr, kind="stable")
+        sorted_holdings = [holdings_list[i] for i in order]
         
         return {
             "total_portfolio_value": round(total_portfolio_value, 2),
-            "unique_symbols": len(market_values),
+            "unique_symbols": len(holdings_list),
             "holdings": sorted_holdings,
             "top_10_holdings": sorted_holdings[:10],
             "timestamp": time.time()
@@ -0,0 +1,191 @@
+"""
+LLM Response Cache
+Pluggable key/value backends and a response cache for deterministic LLM calls
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(Protocol):
+    """Storage interface for cached values"""
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None when missing or expired"""
+        ...
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, optionally expiring after ttl_seconds"""
+        ...
+    
+    def delete(self, key: str):
+        """Remove a value if present"""
+        ...
+    
+    def clear(self):
+        """Remove every stored value"""
+        ...
+    
+    def size(self) -> Optional[int]:
+        """Number of stored values, or None when it cannot be counted cheaply"""
+        ...
+
+class InMemoryLRUBackend:
+    """Thread-safe in-process LRU store with optional per-entry expiry"""
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a value and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key: str):
+        """Remove a value if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Remove every stored value"""
+        with self._lock:
+            self._entries.clear()
+    
+    def size(self) -> int:
+        """Number of stored values, including any not yet noticed as expired"""
+        return len(self._entries)
+
+class RedisBackend:
+    """Shared store in Redis, visible to every agent process; values are kept as JSON"""
+    
+    def __init__(self, client, prefix: str = "llm:"):
+        self.client = client
+        self.prefix = prefix
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a value, or None when missing or expired"""
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, letting Redis expire it after ttl_seconds"""
+        ttl = int(ttl_seconds) if ttl_seconds else None
+        self.client.set(self.prefix + key, json.dumps(value, default=str), ex=ttl)
+    
+    def delete(self, key: str):
+        """Remove a value if present"""
+        self.client.delete(self.prefix + key)
+    
+    def clear(self):
+        """Remove every value under this backend's prefix"""
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+    
+    def size(self) -> Optional[int]:
+        """Not tracked: counting would scan the whole keyspace on every health check"""
+        return None
+
+def connect_redis(url: Optional[str] = None):
+    """Redis client for url or REDIS_URL, or None when unset or unavailable"""
+    url = url or os.getenv("REDIS_URL")
+    if not url:
+        return None
+    try:
+        import redis
+        
+        client = redis.Redis.from_url(url)
+        client.ping()
+        return client
+    except ImportError:
+        logger.warning("redis not installed; using in-process caches. Install with: pip install redis")
+    except Exception as e:
+        logger.warning("Redis at %s unreachable; using in-process caches: %s", url, e)
+    return None
+
+def make_backend(maxsize: int = 1024, prefix: str = "llm:") -> CacheBackend:
+    """Redis backend when REDIS_URL is configured, otherwise an in-process LRU"""
+    client = connect_redis()
+    if client is not None:
+        return RedisBackend(client, prefix)
+    return InMemoryLRUBackend(maxsize=maxsize)
+
+class LLMCache:
+    """Response cache for LLM completions over a pluggable backend"""
+    
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl_seconds: Optional[float] = None,
+                 response_type: Optional[type] = None):
+        self.backend = backend if backend is not None else InMemoryLRUBackend()
+        self.ttl_seconds = ttl_seconds
+        # Backends that serialize values get plain dicts, rebuilt into response_type on read
+        self.response_type = response_type if isinstance(self.backend, RedisBackend) else None
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(model: str, request) -> str:
+        """Hash every request field that can change the completion"""
+        payload = {
+            "model": model,
+            "prompt": request.prompt,
+            "system_prompt": request.system_prompt,
+            "instructions": request.instructions,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "context": request.context or {}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def get(self, key: str):
+        """Return a cached response, counting the hit or miss"""
+        response = self.backend.get(key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.response_type is not None:
+                response = self.response_type(**response)
+        return response
+    
+    def set(self, key: str, response):
+        """Store a response for the configured TTL"""
+        if self.response_type is not None:
+            response = asdict(response)
+        self.backend.set(key, response, self.ttl_seconds)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        # Shared backends may not count entries cheaply; leave size out rather than scan
+        size = self.backend.size()
+        stats = {"size": size} if size is not None else {}
+        stats.update(hits=self.hits, misses=self.misses, ttl_seconds=self.ttl_seconds)
+        maxsize = getattr(self.backend, "maxsize", None)
+        if maxsize is not None:
+            stats["maxsize"] = maxsize
+        return stats
@@ -21,13 +21,14 @@ class LLMConfig:
             "preferred_provider": os.getenv("LLM_PROVIDER", "dummy_local"),
             "aws_bedrock": {
                 "model_id": os.getenv("AWS_BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0"),
+                "fast_model_id": os.getenv("AWS_BEDROCK_FAST_MODEL_ID", "anthropic.claude-instant-v1"),
                 "region": os.getenv("AWS_REGION", "us-east-1"),
                 "max_tokens": int(os.getenv("AWS_BEDROCK_MAX_TOKENS", "1000")),
                 "temperature": float(os.getenv("AWS_BEDROCK_TEMPERATURE", "0.7"))
             },
             "dummy_local": {
                 "model_name": "dummy-local-v1.0",
-                "processing_delay": float(os.getenv("DUMMY_PROCESSING_DELAY", "0.5")),
+                "processing_delay": float(os.getenv("DUMMY_LLM_DELAY_MS", "0")) / 1000.0,
                 "max_tokens": int(os.getenv("DUMMY_MAX_TOKENS", "4000"))
             }
         }
@@ -62,10 +63,12 @@ class LLMConfig:
             "aws_configured": self.is_aws_configured(),
             "aws_region": self.config["aws_bedrock"]["region"],
             "aws_model": self.config["aws_bedrock"]["model_id"],
+            "aws_fast_model": self.config["aws_bedrock"]["fast_model_id"],
             "environment_variables": {
                 "LLM_PROVIDER": os.getenv("LLM_PROVIDER"),
                 "AWS_REGION": os.getenv("AWS_REGION"),
-                "AWS_BEDROCK_MODEL_ID": os.getenv("AWS_BEDROCK_MODEL_ID")
+                "AWS_BEDROCK_MODEL_ID": os.getenv("AWS_BEDROCK_MODEL_ID"),
+                "AWS_BEDROCK_FAST_MODEL_ID": os.getenv("AWS_BEDROCK_FAST_MODEL_ID")
             }
         }
 
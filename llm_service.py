@@ -4,20 +4,43 @@ Provides unified interface for AWS Bedrock and local dummy LLM services
 """
 
 import json
+import logging
 import time
+import asyncio
 import random
 import os
+import sys
+import re
+import hashlib
+import threading
+import atexit
+import itertools
+import orjson
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+from dataclasses import dataclass, field, replace, asdict
 from enum import Enum
 
+from llm_cache import LLMCache, InMemoryLRUBackend
+
+logger = logging.getLogger(__name__)
+
+# Keep botocore's per-connection INFO chatter out of agent logs
+logging.getLogger("botocore").setLevel(logging.WARNING)
+
+_WORD_RE = re.compile(r"\S+")
+
+def count_words(text: str) -> int:
+    """Count whitespace-separated words without building a list"""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
 class LLMProvider(Enum):
     """Available LLM providers"""
     AWS_BEDROCK = "aws_bedrock"
     DUMMY_LOCAL = "dummy_local"
 
-@dataclass
+@dataclass(slots=True)
 class LLMRequest:
     """Standard LLM request format"""
     prompt: str
@@ -25,8 +48,19 @@ class LLMRequest:
     temperature: float = 0.7
     system_prompt: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
+    # Fixed task instructions, laid out ahead of the prompt so providers see a stable prefix
+    instructions: Optional[str] = None
+    # Model tier to route to ("fast" or "accurate"); providers without tiers ignore it
+    model_hint: Optional[str] = None
+    # Word-count estimate of the prompt, computed once per request
+    prompt_tokens: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.prompt_tokens = count_words(self.prompt)
+        if self.instructions:
+            self.prompt_tokens += count_words(self.instructions)
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Standard LLM response format"""
     content: str
@@ -37,14 +71,78 @@ class LLMResponse:
     success: bool
     error: Optional[str] = None
 
+# Seconds a service availability check is trusted before re-checking
+AVAILABILITY_TTL_SECONDS = 30.0
+
+# Read size for Bedrock response bodies, and the largest per-thread buffer kept between calls
+RESPONSE_READ_CHUNK = 65536
+RESPONSE_BUFFER_MAX = 1 << 20
+
+_response_buffers = threading.local()
+
+def _read_json_body(stream) -> Any:
+    """Parse a streamed JSON body through a reusable per-thread buffer"""
+    buf = getattr(_response_buffers, "buf", None)
+    if buf is None:
+        buf = _response_buffers.buf = bytearray(RESPONSE_READ_CHUNK)
+    
+    # Overwrite in place so the buffer keeps its capacity across calls
+    size = 0
+    while True:
+        chunk = stream.read(RESPONSE_READ_CHUNK)
+        if not chunk:
+            break
+        buf[size:size + len(chunk)] = chunk
+        size += len(chunk)
+    
+    with memoryview(buf) as view:
+        result = orjson.loads(view[:size])
+    if len(buf) > RESPONSE_BUFFER_MAX:
+        _response_buffers.buf = bytearray(RESPONSE_READ_CHUNK)
+    return result
+
+# Distinct system prompt and instruction pairs whose Claude prompt prefix is kept per Bedrock service
+PROMPT_PREFIX_CACHE_SIZE = 32
+
+# Upper bound on in-flight completions per batch, kept under Bedrock's per-account quota
+MAX_CONCURRENT_GENERATIONS = 16
+
+async def _gather_bounded(generate, requests: List[LLMRequest]) -> List[LLMResponse]:
+    """Run an async generate callable over requests with bounded concurrency"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+    
+    async def run(request: LLMRequest) -> LLMResponse:
+        async with semaphore:
+            return await generate(request)
+    
+    return list(await asyncio.gather(*(run(request) for request in requests)))
+
 class LLMServiceInterface(ABC):
     """Abstract interface for LLM services"""
     
+    # Whether completions follow structured-output instructions such as returning a JSON array
+    supports_structured_output = False
+    
     @abstractmethod
     def generate(self, request: LLMRequest) -> LLMResponse:
         """Generate text completion from LLM"""
         pass
     
+    async def generate_async(self, request: LLMRequest) -> LLMResponse:
+        """Generate text completion without blocking the event loop"""
+        return await asyncio.to_thread(self.generate, request)
+    
+    async def generate_many(self, requests: List[LLMRequest]) -> List[LLMResponse]:
+        """Generate completions for independent requests concurrently, in request order"""
+        return await _gather_bounded(self.generate_async, requests)
+    
+    def generate_stream(self, request: LLMRequest) -> Iterator[str]:
+        """Yield completion text as it becomes available"""
+        response = self.generate(request)
+        if not response.success:
+            raise RuntimeError(response.error)
+        yield response.content
+    
     @abstractmethod
     def is_available(self) -> bool:
         """Check if the LLM service is available"""
@@ -54,88 +152,137 @@ class LLMServiceInterface(ABC):
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model"""
         pass
+    
+    def resolve_model(self, request: LLMRequest) -> str:
+        """Name of the model that would answer this request"""
+        return self.get_model_info()["model"]
 
 class DummyLLMService(LLMServiceInterface):
     """Dummy LLM service for local testing and development"""
     
+    # Single case-insensitive pass over the prompt; avoids lowercasing a full copy
+    _CATEGORY_KEYWORDS_RE = re.compile(r"portfolio|analysis|market|risk", re.IGNORECASE)
+    
+    # Pre-defined responses for common financial analysis tasks
+    response_templates = {
+        "portfolio_analysis": [
+            "Based on the portfolio data provided, I observe a well-diversified allocation across technology, healthcare, and financial sectors. The portfolio shows strong exposure to growth stocks with {total_value} in total assets under management.",
+            "The portfolio demonstrates institutional-quality diversification with holdings spanning {num_holdings} different securities. Key observations include significant positions in technology leaders and defensive dividend-paying stocks.",
+            "This portfolio reflects a balanced growth strategy with appropriate risk management. The mix of individual stocks, ETFs, and alternative investments suggests sophisticated institutional management."
+        ],
+        "market_analysis": [
+            "Current market conditions show {market_trend} patterns with notable strength in technology and healthcare sectors. The portfolio positioning appears well-suited for the current market environment.",
+            "Market analysis indicates favorable conditions for growth-oriented positions. The current allocation shows prudent exposure to market leaders while maintaining defensive characteristics.",
+            "The market environment supports the current portfolio strategy, with particular strength in the represented sectors and asset classes."
+        ],
+        "risk_assessment": [
+            "Risk analysis reveals a moderate risk profile with appropriate diversification across asset classes. The portfolio's risk-adjusted returns appear favorable given current market conditions.",
+            "The risk characteristics of this portfolio suggest institutional-grade risk management with balanced exposure across growth and defensive positions.",
+            "Risk metrics indicate well-controlled downside exposure while maintaining upside participation in key growth sectors."
+        ],
+        "default": [
+            "Thank you for your request. Based on the provided data, I can offer the following analysis and recommendations tailored to your specific portfolio requirements.",
+            "I've analyzed the information provided and can offer insights based on current market conditions and portfolio characteristics.",
+            "Your request has been processed. Here are my findings based on the data and context provided."
+        ]
+    }
+    
+    # Relative pick frequency per template; context-aware templates are favored
+    _TEMPLATE_WEIGHTS = {
+        "portfolio_analysis": [3, 2, 1],
+        "market_analysis": [2, 1, 1],
+        "risk_assessment": [1, 1, 1],
+        "default": [1, 1, 1]
+    }
+    
+    # Neutral wording for placeholders the request context doesn't supply
+    _PLACEHOLDER_DEFAULTS = {
+        "total_value": "significant",
+        "num_holdings": "multiple",
+        "market_trend": "positive"
+    }
+    
     def __init__(self):
         self.model_name = "dummy-local-v1.0"
-        self.processing_delay = 0.5  # Simulate processing time
-        
-        # Pre-defined responses for common financial analysis tasks
-        self.response_templates = {
-            "portfolio_analysis": [
-                "Based on the portfolio data provided, I observe a well-diversified allocation across technology, healthcare, and financial sectors. The portfolio shows strong exposure to growth stocks with {total_value} in total assets under management.",
-                "The portfolio demonstrates institutional-quality diversification with holdings spanning {num_holdings} different securities. Key observations include significant positions in technology leaders and defensive dividend-paying stocks.",
-                "This portfolio reflects a balanced growth strategy with appropriate risk management. The mix of individual stocks, ETFs, and alternative investments suggests sophisticated institutional management."
-            ],
-            "market_analysis": [
-                "Current market conditions show {market_trend} patterns with notable strength in technology and healthcare sectors. The portfolio positioning appears well-suited for the current market environment.",
-                "Market analysis indicates favorable conditions for growth-oriented positions. The current allocation shows prudent exposure to market leaders while maintaining defensive characteristics.",
-                "The market environment supports the current portfolio strategy, with particular strength in the represented sectors and asset classes."
-            ],
-            "risk_assessment": [
-                "Risk analysis reveals a moderate risk profile with appropriate diversification across asset classes. The portfolio's risk-adjusted returns appear favorable given current market conditions.",
-                "The risk characteristics of this portfolio suggest institutional-grade risk management with balanced exposure across growth and defensive positions.",
-                "Risk metrics indicate well-controlled downside exposure while maintaining upside participation in key growth sectors."
-            ],
-            "default": [
-                "Thank you for your request. Based on the provided data, I can offer the following analysis and recommendations tailored to your specific portfolio requirements.",
-                "I've analyzed the information provided and can offer insights based on current market conditions and portfolio characteristics.",
-                "Your request has been processed. Here are my findings based on the data and context provided."
-            ]
+        # Simulated processing time is opt-in so local runs don't block threads
+        self.processing_delay = float(os.getenv("DUMMY_LLM_DELAY_MS", "0")) / 1000.0
+        # Private generator keeps template picks off the shared module-level random state
+        self._rng = random.Random()
+        self._template_cum_weights = {
+            category: list(itertools.accumulate(weights))
+            for category, weights in self._TEMPLATE_WEIGHTS.items()
+        }
+        self._template_pickers = {
+            category: (lambda templates=templates, cum_weights=self._template_cum_weights[category]:
+                       self._rng.choices(templates, cum_weights=cum_weights)[0])
+            for category, templates in self.response_templates.items()
         }
     
     def generate(self, request: LLMRequest) -> LLMResponse:
-        """Generate a dummy response with realistic delay"""
-        start_time = time.time()
+        """Generate a dummy response with optional simulated delay"""
+        start_ns = time.perf_counter_ns()
         
         # Simulate processing delay
-        time.sleep(self.processing_delay)
+        if self.processing_delay:
+            time.sleep(self.processing_delay)
         
-        # Determine response category based on prompt content
-        prompt_lower = request.prompt.lower()
-        if "portfolio" in prompt_lower and "analysis" in prompt_lower:
-            category = "portfolio_analysis"
-        elif "market" in prompt_lower:
-            category = "market_analysis" 
-        elif "risk" in prompt_lower:
-            category = "risk_assessment"
-        else:
-            category = "default"
+        return self._compose_response(request, start_ns)
+    
+    async def generate_async(self, request: LLMRequest) -> LLMResponse:
+        """Generate a dummy response, yielding to the event loop during the delay"""
+        start_ns = time.perf_counter_ns()
         
-        # Select random response template
-        templates = self.response_templates[category]
-        base_response = random.choice(templates)
+        if self.processing_delay:
+            await asyncio.sleep(self.processing_delay)
+        
+        return self._compose_response(request, start_ns)
+    
+    def _compose_response(self, request: LLMRequest, start_ns: int) -> LLMResponse:
+        """Build the templated response for a request"""
+        # Determine response category based on prompt content
+        category = self._classify_prompt(request.prompt, request.instructions)
         
         # Add context-aware enhancements if context provided
+        placeholders = dict(self._PLACEHOLDER_DEFAULTS)
         if request.context:
             if "total_value" in request.context:
-                total_value = f"${request.context['total_value']:,.0f}"
-                base_response = base_response.replace("{total_value}", total_value)
+                placeholders["total_value"] = f"${request.context['total_value']:,.0f}"
             if "num_holdings" in request.context:
-                base_response = base_response.replace("{num_holdings}", str(request.context['num_holdings']))
+                placeholders["num_holdings"] = request.context["num_holdings"]
             if "market_trend" in request.context:
-                base_response = base_response.replace("{market_trend}", request.context['market_trend'])
+                placeholders["market_trend"] = request.context["market_trend"]
         
-        # Clean up any unreplaced placeholders
-        base_response = base_response.replace("{total_value}", "significant").replace("{num_holdings}", "multiple").replace("{market_trend}", "positive")
+        # Select random response template and fill it in a single pass
+        base_response = self._template_pickers[category]().format_map(placeholders)
         
         # Add system prompt context if provided
         if request.system_prompt:
             base_response = f"{base_response}\n\nNote: {request.system_prompt}"
         
-        processing_time = time.time() - start_time
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
         
         return LLMResponse(
             content=base_response,
             provider="dummy_local",
             model=self.model_name,
-            tokens_used=len(base_response.split()) + len(request.prompt.split()),
+            tokens_used=count_words(base_response) + request.prompt_tokens,
             processing_time=processing_time,
             success=True
         )
     
+    def _classify_prompt(self, prompt: str, instructions: Optional[str] = None) -> str:
+        """Map prompt and instruction keywords to a response template category"""
+        keywords = {match.lower() for match in self._CATEGORY_KEYWORDS_RE.findall(prompt)}
+        if instructions:
+            keywords.update(match.lower() for match in self._CATEGORY_KEYWORDS_RE.findall(instructions))
+        if "portfolio" in keywords and "analysis" in keywords:
+            return "portfolio_analysis"
+        elif "market" in keywords:
+            return "market_analysis"
+        elif "risk" in keywords:
+            return "risk_assessment"
+        return "default"
+    
     def is_available(self) -> bool:
         """Dummy service is always available"""
         return True
@@ -154,125 +301,383 @@ class DummyLLMService(LLMServiceInterface):
 class AWSBedrockService(LLMServiceInterface):
     """AWS Bedrock LLM service integration"""
     
-    def __init__(self, model_id: str = "anthropic.claude-3-sonnet-20240229-v1:0", region: str = "us-east-1"):
-        self.model_id = model_id
+    # One boto3 session per process; clients built from it are thread-safe
+    _session = None
+    _session_lock = threading.Lock()
+    
+    # Claude context window shared by prompt and completion, in tokens
+    MAX_CONTEXT_TOKENS = 100_000
+    
+    supports_structured_output = True
+    
+    # Fixed-shape Claude request body; only prompt, max tokens and temperature vary
+    _BODY_TEMPLATE = (b'{"prompt":%s,"max_tokens_to_sample":%d,"temperature":%.3f,'
+                      b'"top_p":0.9,"stop_sequences":["\\n\\nHuman:"]}')
+    
+    def __init__(self, model_id: str = "anthropic.claude-3-sonnet-20240229-v1:0", region: str = "us-east-1",
+                 model_tiers: Optional[Dict[str, str]] = None):
+        # Interned once so every response shares a single model string
+        self.model_id = sys.intern(model_id)
+        # Smaller, cheaper model for routine requests; the default model for accuracy-sensitive ones
+        if model_tiers is None:
+            model_tiers = {
+                "fast": os.getenv("AWS_BEDROCK_FAST_MODEL_ID", "anthropic.claude-instant-v1"),
+                "accurate": model_id
+            }
+        self.model_tiers = {tier: sys.intern(model) for tier, model in model_tiers.items()}
         self.region = region
         self.client = None
+        # "System: ...\n\nHuman: <instructions>" prefixes for recently seen system prompts
+        self._prefix_cache: "OrderedDict[Tuple[Optional[str], Optional[str]], str]" = OrderedDict()
+        self._prefix_lock = threading.Lock()
+        # Unknown until the first invoke_model call proves or disproves access
+        self._available: Optional[bool] = None
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize AWS Bedrock client"""
         try:
             import boto3
+            from botocore.config import Config
             from botocore.exceptions import NoCredentialsError, ClientError
             
-            self.client = boto3.client(
-                service_name='bedrock-runtime',
-                region_name=self.region
+            # Larger keep-alive pool so concurrent agent threads reuse warm TLS connections
+            client_config = Config(
+                max_pool_connections=64,
+                retries={"max_attempts": 2, "mode": "adaptive"},
+                tcp_keepalive=True,
+                read_timeout=60,
+                connect_timeout=5
             )
             
-            # Test connection
-            self.client.list_foundation_models()
+            # Session creation and client construction are not thread-safe
+            with AWSBedrockService._session_lock:
+                if AWSBedrockService._session is None:
+                    AWSBedrockService._session = boto3.Session()
+                self.client = AWSBedrockService._session.client(
+                    service_name='bedrock-runtime',
+                    region_name=self.region,
+                    config=client_config
+                )
             
         except ImportError:
-            print("Warning: boto3 not installed. AWS Bedrock service unavailable.")
-            print("Install with: pip install boto3")
+            logger.warning("boto3 not installed. AWS Bedrock service unavailable. "
+                           "Install with: pip install boto3")
             self.client = None
         except (NoCredentialsError, ClientError) as e:
-            print(f"Warning: AWS credentials not configured. Bedrock unavailable: {e}")
+            logger.warning("AWS credentials not configured. Bedrock unavailable: %s", e)
             self.client = None
         except Exception as e:
-            print(f"Warning: Failed to initialize AWS Bedrock client: {e}")
+            logger.warning("Failed to initialize AWS Bedrock client: %s", e)
             self.client = None
     
     def generate(self, request: LLMRequest) -> LLMResponse:
         """Generate text using AWS Bedrock"""
+        model_id = self.resolve_model(request)
         if not self.client:
             return LLMResponse(
                 content="",
                 provider="aws_bedrock",
-                model=self.model_id,
+                model=model_id,
                 tokens_used=0,
                 processing_time=0,
                 success=False,
                 error="AWS Bedrock client not available"
             )
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        
+        # Construct the prompt for Claude
+        full_prompt = self._build_prompt(request)
+        
+        # ~4 characters per token; skip the round-trip for requests Bedrock would reject
+        if (len(full_prompt) >> 2) + request.max_tokens > self.MAX_CONTEXT_TOKENS:
+            return LLMResponse(
+                content="",
+                provider="aws_bedrock",
+                model=model_id,
+                tokens_used=0,
+                processing_time=(time.perf_counter_ns() - start_ns) / 1e9,
+                success=False,
+                error="prompt too long"
+            )
         
         try:
-            # Construct the prompt for Claude
-            full_prompt = request.prompt
-            if request.system_prompt:
-                full_prompt = f"System: {request.system_prompt}\n\nHuman: {request.prompt}\n\nAssistant:"
-            else:
-                full_prompt = f"Human: {request.prompt}\n\nAssistant:"
-            
-            # Prepare request body for Claude
-            body = {
-                "prompt": full_prompt,
-                "max_tokens_to_sample": request.max_tokens,
-                "temperature": request.temperature,
-                "top_p": 0.9,
-                "stop_sequences": ["\n\nHuman:"]
-            }
-            
             # Call Bedrock
             response = self.client.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body),
+                modelId=model_id,
+                body=self._build_body(full_prompt, request),
                 contentType="application/json",
                 accept="application/json"
             )
             
             # Parse response
-            response_body = json.loads(response['body'].read())
+            response_body = _read_json_body(response['body'])
             content = response_body.get('completion', '').strip()
+            self._available = True
             
-            processing_time = time.time() - start_time
+            processing_time = (time.perf_counter_ns() - start_ns) / 1e9
             
             return LLMResponse(
                 content=content,
                 provider="aws_bedrock",
-                model=self.model_id,
-                tokens_used=len(content.split()) + len(request.prompt.split()),
+                model=model_id,
+                tokens_used=count_words(content) + request.prompt_tokens,
                 processing_time=processing_time,
                 success=True
             )
             
         except Exception as e:
-            processing_time = time.time() - start_time
+            if self._is_access_error(e):
+                self._available = False
+            processing_time = (time.perf_counter_ns() - start_ns) / 1e9
             return LLMResponse(
                 content="",
                 provider="aws_bedrock", 
-                model=self.model_id,
+                model=model_id,
                 tokens_used=0,
                 processing_time=processing_time,
                 success=False,
                 error=str(e)
             )
     
+    def generate_stream(self, request: LLMRequest) -> Iterator[str]:
+        """Yield completion chunks from Bedrock as they arrive"""
+        if not self.client:
+            raise RuntimeError("AWS Bedrock client not available")
+        
+        try:
+            response = self.client.invoke_model_with_response_stream(
+                modelId=self.resolve_model(request),
+                body=self._build_body(self._build_prompt(request), request),
+                contentType="application/json",
+                accept="application/json"
+            )
+        except Exception as e:
+            if self._is_access_error(e):
+                self._available = False
+            raise
+        self._available = True
+        
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if chunk:
+                text = orjson.loads(chunk["bytes"]).get("completion", "")
+                if text:
+                    yield text
+    
+    def _prompt_prefix(self, system_prompt: Optional[str], instructions: Optional[str] = None) -> str:
+        """Return the cached prompt prefix for a system prompt and instruction block"""
+        cache_key = (system_prompt, instructions)
+        with self._prefix_lock:
+            prefix = self._prefix_cache.get(cache_key)
+            if prefix is not None:
+                self._prefix_cache.move_to_end(cache_key)
+                return prefix
+            prefix = f"System: {system_prompt}\n\nHuman: " if system_prompt else "Human: "
+            if instructions:
+                prefix = f"{prefix}{instructions}\n\n"
+            self._prefix_cache[cache_key] = prefix
+            if len(self._prefix_cache) > PROMPT_PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+            return prefix
+    
+    def _build_prompt(self, request: LLMRequest) -> str:
+        """Wrap the request in Claude's Human/Assistant turn format"""
+        return self._prompt_prefix(request.system_prompt, request.instructions) + request.prompt + "\n\nAssistant:"
+    
+    def _build_body(self, full_prompt: str, request: LLMRequest) -> bytes:
+        """Serialize the Claude text-completion request body"""
+        # orjson handles escaping the prompt; the rest of the body is templated
+        return self._BODY_TEMPLATE % (orjson.dumps(full_prompt), request.max_tokens, request.temperature)
+    
+    @staticmethod
+    def _is_access_error(error: Exception) -> bool:
+        """Whether an invoke failure means Bedrock is unusable with these credentials"""
+        from botocore.exceptions import NoCredentialsError, ClientError
+        
+        if isinstance(error, NoCredentialsError):
+            return True
+        if isinstance(error, ClientError):
+            code = error.response.get("Error", {}).get("Code", "")
+            return code in ("AccessDeniedException", "UnrecognizedClientException",
+                            "ExpiredTokenException", "ResourceNotFoundException")
+        return False
+    
+    def resolve_model(self, request: LLMRequest) -> str:
+        """Route a request to the model for its hinted tier, or the default model"""
+        return self.model_tiers.get(request.model_hint, self.model_id)
+    
     def is_available(self) -> bool:
         """Check if AWS Bedrock is available"""
-        return self.client is not None
+        return self.client is not None and self._available is not False
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get AWS Bedrock model information"""
         return {
             "provider": "aws_bedrock",
             "model": self.model_id,
+            "model_tiers": self.model_tiers,
             "region": self.region,
             "capabilities": ["text_generation", "analysis", "reasoning"],
-            "max_tokens": 100000,
+            "max_tokens": self.MAX_CONTEXT_TOKENS,
             "cost_per_token": 0.000008  # Approximate cost for Claude Sonnet
         }
 
+class SemanticCache:
+    """Embedding-similarity cache that reuses responses for near-duplicate prompts
+    
+    Requires the optional sentence-transformers and faiss packages, which are
+    loaded lazily on first use. Entries only match within the same scope
+    (model, system prompt, max_tokens, context), so only the prompt wording
+    is compared semantically.
+    """
+    
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 threshold: float = 0.92, index_path: Optional[str] = None, max_entries: int = 10_000):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.index_path = index_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._encoder = None
+        self._index = None
+        self._scopes: List[str] = []
+        self._responses: List[LLMResponse] = []
+        self._enabled = None
+        self._lock = threading.Lock()
+    
+    def _initialize(self) -> bool:
+        """Load the embedding model and FAISS index on first use"""
+        if self._enabled is not None:
+            return self._enabled
+        
+        # Concurrent first requests must not load the model or build the index twice
+        with self._lock:
+            if self._enabled is not None:
+                return self._enabled
+            
+            try:
+                import faiss
+                from sentence_transformers import SentenceTransformer
+                
+                self._encoder = SentenceTransformer(self.model_name)
+                self._index = faiss.IndexFlatIP(self._encoder.get_sentence_embedding_dimension())
+                
+                if self.index_path and os.path.exists(self.index_path):
+                    self._index = faiss.read_index(self.index_path)
+                    with open(f"{self.index_path}.json") as f:
+                        entries = json.load(f)
+                    self._scopes = [entry["scope"] for entry in entries]
+                    self._responses = [LLMResponse(**entry["response"]) for entry in entries]
+                    self._evict_oldest()
+                
+                if self.index_path:
+                    atexit.register(self.save)
+                self._enabled = True
+                
+            except ImportError:
+                logger.warning("sentence-transformers/faiss not installed. Semantic LLM cache disabled. "
+                               "Install with: pip install sentence-transformers faiss-cpu")
+                self._enabled = False
+            except Exception as e:
+                logger.warning("Failed to initialize semantic LLM cache: %s", e)
+                self._enabled = False
+            
+            return self._enabled
+    
+    def _evict_oldest(self):
+        """Drop the oldest entries once over max_entries; caller holds the lock"""
+        if len(self._responses) <= self.max_entries:
+            return
+        import faiss
+        
+        # Evict an extra tenth so the index is not compacted on every add
+        count = len(self._responses) - self.max_entries + self.max_entries // 10
+        # Flat indexes renumber after removal, so ids stay aligned with the lists
+        self._index.remove_ids(faiss.IDSelectorRange(0, count))
+        del self._scopes[:count]
+        del self._responses[:count]
+    
+    @staticmethod
+    def make_scope(model: str, request: LLMRequest) -> str:
+        """Hash the request fields that must match exactly for a semantic hit"""
+        payload = {
+            "model": model,
+            "system_prompt": request.system_prompt,
+            "instructions": request.instructions,
+            "max_tokens": request.max_tokens,
+            "context": request.context or {}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def embed(self, prompt: str):
+        """Return an L2-normalized embedding row for the prompt, or None if disabled"""
+        if not self._initialize():
+            return None
+        return self._encoder.encode([prompt], normalize_embeddings=True).astype("float32")
+    
+    def lookup(self, scope: str, vector) -> Optional[LLMResponse]:
+        """Return the closest cached response in scope if it clears the similarity threshold"""
+        with self._lock:
+            if self._index.ntotal:
+                scores, ids = self._index.search(vector, min(8, self._index.ntotal))
+                for score, idx in zip(scores[0], ids[0]):
+                    if score < self.threshold:
+                        break
+                    if self._scopes[idx] == scope:
+                        self.hits += 1
+                        return self._responses[idx]
+            self.misses += 1
+            return None
+    
+    def add(self, scope: str, vector, response: LLMResponse):
+        """Index a new prompt embedding alongside its response"""
+        with self._lock:
+            self._index.add(vector)
+            self._scopes.append(scope)
+            self._responses.append(response)
+            self._evict_oldest()
+    
+    def save(self):
+        """Persist the FAISS index and its responses to index_path"""
+        if not self._enabled or not self.index_path:
+            return
+        import faiss
+        
+        with self._lock:
+            faiss.write_index(self._index, self.index_path)
+            with open(f"{self.index_path}.json", "w") as f:
+                json.dump([
+                    {"scope": scope, "response": asdict(response)}
+                    for scope, response in zip(self._scopes, self._responses)
+                ], f)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get semantic cache size and hit/miss counters"""
+        return {
+            "enabled": bool(self._enabled),
+            "size": len(self._responses),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Semantic reuse is limited to near-deterministic requests
+SEMANTIC_CACHE_MAX_TEMPERATURE = 0.2
+
 class LLMServiceManager:
     """Manager for LLM services with automatic fallback"""
     
     def __init__(self, preferred_provider: LLMProvider = LLMProvider.AWS_BEDROCK):
         self.preferred_provider = preferred_provider
         self.services = {}
+        self._avail_cache: Dict[LLMProvider, Tuple[float, bool]] = {}
+        # Exact completions stay in-process and bounded; agents share their own TTL'd caches via Redis
+        self._cache = LLMCache(InMemoryLRUBackend(maxsize=1024))
+        self._semantic_cache = None
+        if os.getenv("LLM_SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes"):
+            self._semantic_cache = SemanticCache(index_path=os.getenv("LLM_SEMANTIC_CACHE_PATH"))
         self._initialize_services()
     
     def _initialize_services(self):
@@ -289,21 +694,74 @@ class LLMServiceManager:
         # Try preferred provider first
         if self.preferred_provider in self.services:
             service = self.services[self.preferred_provider]
-            if service.is_available():
+            if self._is_service_available(self.preferred_provider, service):
                 return service
         
         # Fallback to any available service
         for provider, service in self.services.items():
-            if service.is_available():
+            if self._is_service_available(provider, service):
                 return service
         
         # Should never happen since dummy is always available
         raise RuntimeError("No LLM services available")
     
+    def _is_service_available(self, provider: LLMProvider, service: LLMServiceInterface) -> bool:
+        """Check service availability, trusting a recent answer for a short TTL"""
+        now = time.monotonic()
+        cached = self._avail_cache.get(provider)
+        if cached and now - cached[0] < AVAILABILITY_TTL_SECONDS:
+            return cached[1]
+        available = service.is_available()
+        self._avail_cache[provider] = (now, available)
+        return available
+    
     def generate(self, request: LLMRequest) -> LLMResponse:
         """Generate text using the best available service"""
         service = self.get_available_service()
-        return service.generate(request)
+        model = service.resolve_model(request)
+        
+        # Only deterministic completions are safe to replay exactly
+        key = None
+        if request.temperature == 0:
+            key = self._cache.make_key(model, request)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return replace(cached, processing_time=0.0)
+        
+        # Near-duplicate prompts may reuse low-temperature completions
+        scope = vector = None
+        if self._semantic_cache is not None and request.temperature <= SEMANTIC_CACHE_MAX_TEMPERATURE:
+            vector = self._semantic_cache.embed(request.prompt)
+            if vector is not None:
+                scope = self._semantic_cache.make_scope(model, request)
+                similar = self._semantic_cache.lookup(scope, vector)
+                if similar is not None:
+                    return replace(similar, processing_time=0.0)
+        
+        response = service.generate(request)
+        if not response.success:
+            # A failure may mean the service went away; re-check on the next call
+            self._avail_cache.clear()
+            if not service.is_available():
+                # Access was only just found to be missing; retry on the fallback service
+                return self.generate(request)
+        if response.success:
+            if key is not None:
+                self._cache.set(key, response)
+            if vector is not None:
+                self._semantic_cache.add(scope, vector, response)
+        return response
+    
+    async def generate_many(self, requests: List[LLMRequest]) -> List[LLMResponse]:
+        """Generate several independent completions concurrently through the caches"""
+        async def generate_one(request: LLMRequest) -> LLMResponse:
+            return await asyncio.to_thread(self.generate, request)
+        
+        return await _gather_bounded(generate_one, requests)
+    
+    def generate_stream(self, request: LLMRequest) -> Iterator[str]:
+        """Stream completion text from the best available service, bypassing the caches"""
+        return self.get_available_service().generate_stream(request)
     
     def get_service_status(self) -> Dict[str, Any]:
         """Get status of all configured services"""
@@ -314,13 +772,26 @@ class LLMServiceManager:
                 "model_info": service.get_model_info()
             }
         return status
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics"""
+        stats = self._cache.get_stats()
+        if self._semantic_cache is not None:
+            stats["semantic"] = self._semantic_cache.get_stats()
+        return stats
 
-# Global LLM service manager instance
-llm_manager = LLMServiceManager()
+# Global LLM service manager instance, created on first use so importing stays cheap
+_llm_manager: Optional[LLMServiceManager] = None
+_llm_manager_lock = threading.Lock()
 
 def get_llm_service() -> LLMServiceManager:
     """Get the global LLM service manager"""
-    return llm_manager
+    global _llm_manager
+    if _llm_manager is None:
+        with _llm_manager_lock:
+            if _llm_manager is None:
+                _llm_manager = LLMServiceManager()
+    return _llm_manager
 
 # Convenience functions
 def generate_text(prompt: str, system_prompt: str = None, **kwargs) -> LLMResponse:
@@ -330,12 +801,12 @@ def generate_text(prompt: str, system_prompt: str = None, **kwargs) -> LLMRespon
         system_prompt=system_prompt,
         **kwargs
     )
-    return llm_manager.generate(request)
+    return get_llm_service().generate(request)
 
 def is_llm_available() -> bool:
     """Check if any LLM service is available"""
     try:
-        service = llm_manager.get_available_service()
+        service = get_llm_service().get_available_service()
         return service.is_available()
     except:
         return False
\ No newline at end of file
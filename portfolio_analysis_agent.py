@@ -4,16 +4,188 @@ Enhanced A2A agent that provides AI-powered portfolio analysis and insights
 """
 
 import json
+import re
+import orjson
+import sys
 import time
+import queue
+import functools
+import threading
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any, List
-from flask import Flask, request, jsonify
-from dataclasses import dataclass, asdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Tuple
+import jinja2
+from flask import Flask, Response, request
+from dataclasses import dataclass, asdict, replace
 
-from llm_service import get_llm_service, LLMRequest, generate_text
+from llm_service import get_llm_service, LLMRequest, LLMResponse
+from llm_cache import LLMCache, InMemoryLRUBackend, connect_redis, make_backend
+from csv_cache import load_csv
 from a2a_protocol import A2AProtocolServer, AgentCard, AgentCapability
 
+# Responses generated above this temperature are not cached
+CACHE_MAX_TEMPERATURE = 0.4
+
+# Run portfolio analysis and risk assessment at temperature 0 so the shared LLM cache can replay them
+DETERMINISTIC_ANALYSIS = os.getenv("DETERMINISTIC_ANALYSIS", "true").lower() in ("1", "true", "yes")
+
+# Model tier per task: routine write-ups go to the fast model, risk and strategy to the accurate one
+TASK_MODEL_HINTS = {
+    "portfolio_analysis_llm": "fast",
+    "market_commentary": "fast",
+    "risk_assessment_llm": "accurate",
+    "investment_insights": "accurate"
+}
+
+# Client-name keywords and their client type; lower rank wins when several match.
+# "management" also covers "asset management", so that name maps to Hedge Fund / Private Equity.
+_CLIENT_TYPE_KEYWORDS = {
+    "pension": (0, "Pension Fund"),
+    "retirement": (0, "Pension Fund"),
+    "calpers": (0, "Pension Fund"),
+    "capital": (1, "Hedge Fund / Private Equity"),
+    "partners": (1, "Hedge Fund / Private Equity"),
+    "management": (1, "Hedge Fund / Private Equity"),
+    "fund": (1, "Hedge Fund / Private Equity"),
+    "investments": (2, "Asset Management"),
+    "advisors": (2, "Asset Management")
+}
+_CLIENT_TYPE_RE = re.compile("|".join(_CLIENT_TYPE_KEYWORDS), re.IGNORECASE)
+
+def _money(value: Any, places: int = 0) -> str:
+    """Format a dollar amount with thousands separators"""
+    return f"${float(value):,.{places}f}"
+
+def _percent_of(value: float, total: float) -> str:
+    """Format value as a percentage of total"""
+    return f"{(value / total) * 100 if total > 0 else 0:.1f}%"
+
+# NumPy values from the vectorized aggregations serialize without conversion
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _json_response(payload: Any, status: int = 200) -> Response:
+    """Serialize a JSON response body with orjson"""
+    return Response(orjson.dumps(payload, default=str, option=_ORJSON_OPTIONS),
+                    status=status, mimetype="application/json")
+
+# LLM prompt bodies, compiled once per agent
+PROMPT_TEMPLATES = {
+    "lists": """\
+{% macro holding_lines(holdings) %}
+{% for holding in holdings %}
+{{ loop.index }}. {{ holding.get('symbol', '') }}: {{ holding.get('market_value', 0)|money }}
+{% endfor %}
+{% endmacro %}
+{% macro sector_lines(stats) %}
+{% for sector, value in stats.ranked() %}
+- {{ sector }}: {{ value|money }} ({{ value|percent_of(stats.total) }})
+{% endfor %}
+{% endmacro %}""",
+    "portfolio_analysis": """\
+{% from "lists" import holding_lines, sector_lines %}
+Please analyze the following portfolio for {{ client_name }} (ID: {{ client_id }}):
+
+Portfolio Summary:
+- Total Portfolio Value: {{ total_value|money(2) }}
+- Number of Holdings: {{ num_holdings }}
+- Client Type: {{ client_type }}
+
+Top 10 Holdings:
+{{ holding_lines(top_holdings) }}
+Sector Distribution:
+{{ sector_lines(sector_stats) }}""",
+    "portfolio_analysis_compact": """\
+Please analyze the following portfolio for {{ client_name }} (ID: {{ client_id }}):
+
+Portfolio Summary:
+- Total Portfolio Value: {{ total_value|money(2) }}
+- Number of Holdings: {{ num_holdings }}
+- Client Type: {{ client_type }}
+- Portfolio Reference: {{ portfolio_ref }}
+- Composition: {{ composition }}""",
+    "market_commentary": """\
+{% from "lists" import holding_lines, sector_lines %}
+Provide market commentary and outlook based on the following portfolio exposure:
+
+Major Sector Exposures:
+{{ sector_lines(sector_stats) }}
+Significant Positions (>$10M):
+{{ holding_lines(major_positions) }}""",
+    "risk_assessment": """\
+Assess the risk profile of this portfolio:
+
+Portfolio Characteristics:
+- Total Value: {{ total_value|money(2) }}
+- Number of Holdings: {{ num_holdings }}
+- Top 10 Concentration: {{ "%.1f"|format(concentration.top_10_percentage) }}%
+- Largest Single Position: {{ "%.1f"|format(concentration.largest_position_percentage) }}%
+
+Sector Concentration Analysis:
+- Herfindahl Index: {{ "%.3f"|format(sector_concentration.herfindahl_index) }}
+- Number of Sectors: {{ sector_concentration.num_sectors }}
+- Largest Sector: {{ "%.1f"|format(sector_concentration.largest_sector_percentage) }}%""",
+    "investment_insights": """\
+Provide strategic investment insights for this institutional portfolio:
+
+Portfolio Overview:
+- Total Assets: {{ summary.get('total_value', 0)|money(2) }}
+- Holdings Count: {{ summary.get('num_holdings', 0) }}
+- Investment Objectives: {{ objectives }}
+
+Current Allocation Summary:
+Total Value: {{ summary.get('total_value', 0)|money(2) }}
+Holdings: {{ summary.get('num_holdings', 0) }} positions
+{% if top_sectors is not none %}
+Top Sectors:
+{% for sector, value in top_sectors %}
+  - {{ sector }}: {{ value|percent_of(sector_total) }}
+{% endfor %}
+{% endif %}"""
+}
+
+# Portfolio analyses queued within the window are sent to the LLM as one request
+BATCH_SIZE = 8
+BATCH_WINDOW_MS = 50
+BATCH_MAX_TOKENS = 4096
+# Longest a request waits on its batch: two Bedrock attempts at the 60 s read timeout, plus margin
+BATCH_RESULT_TIMEOUT_SECONDS = 130
+
+# Request threads per gunicorn worker; LLM calls are blocking network I/O, so threads overlap them
+PROD_THREADS = 32
+
+# Portfolios that quantize to the same fingerprint share one completion
+FINGERPRINT_CACHE_SIZE = 4096
+
+# Task records are kept for an hour, and at most this many in process
+TASK_CACHE_SIZE = 10_000
+TASK_TTL_SECONDS = 3600
+
+@dataclass(frozen=True)
+class SectorStats:
+    """Per-sector totals for one portfolio, shared by the prompts and risk metrics"""
+    names: np.ndarray
+    values: np.ndarray
+    total: float
+    hhi: float
+    sorted_idx: np.ndarray
+    
+    def as_dict(self) -> Dict[str, float]:
+        """Sector totals in first-seen order"""
+        return dict(zip(self.names.tolist(), self.values.tolist()))
+    
+    def ranked(self) -> List[Tuple[str, float]]:
+        """(sector, value) pairs, largest first"""
+        return list(zip(self.names[self.sorted_idx].tolist(), self.values[self.sorted_idx].tolist()))
+    
+    @property
+    def largest_percentage(self) -> float:
+        """Share of the largest sector, in percent"""
+        return float(self.values[self.sorted_idx[0]]) / self.total * 100 if self.total > 0 else 0
+
 @dataclass
 class A2AMessage:
     """A2A Protocol Message Structure"""
@@ -25,12 +197,84 @@ class A2AMessage:
 class PortfolioAnalysisAgent:
     """LLM-enhanced agent for portfolio analysis and insights"""
     
+    # Fixed system prompts and checklists; kept out of the per-client prompt body so
+    # every request starts with a byte-identical prefix
+    PORTFOLIO_ANALYSIS_SYSTEM_PROMPT = "You are a senior portfolio analyst with expertise in institutional investment management. Provide professional, data-driven analysis with specific insights and actionable recommendations."
+    PORTFOLIO_ANALYSIS_INSTRUCTIONS = """Please provide:
+1. Overall portfolio assessment
+2. Strengths and potential concerns
+3. Diversification analysis
+4. Strategic recommendations
+5. Risk considerations
+
+Focus on institutional-level analysis appropriate for this client type."""
+    
+    MARKET_COMMENTARY_SYSTEM_PROMPT = "You are a senior market strategist providing institutional-level market commentary. Focus on actionable insights and strategic positioning advice."
+    MARKET_COMMENTARY_INSTRUCTIONS = """Please provide:
+1. Current market environment assessment
+2. Sector-specific outlook based on portfolio exposure
+3. Key risks and opportunities
+4. Short-term and medium-term market outlook
+5. Positioning recommendations"""
+    
+    RISK_ASSESSMENT_SYSTEM_PROMPT = "You are a senior risk analyst specializing in institutional portfolio risk assessment. Provide quantitative insights and specific risk management recommendations."
+    RISK_ASSESSMENT_INSTRUCTIONS = """Please provide:
+1. Overall risk assessment and risk score (1-10, where 10 is highest risk)
+2. Key risk factors and concerns
+3. Concentration risk analysis
+4. Diversification effectiveness
+5. Risk mitigation recommendations"""
+    
+    INVESTMENT_INSIGHTS_SYSTEM_PROMPT = "You are a senior investment strategist providing institutional-level strategic guidance. Focus on strategic themes, positioning insights, and actionable recommendations."
+    INVESTMENT_INSIGHTS_INSTRUCTIONS = """Please provide:
+1. Strategic investment insights and themes
+2. Portfolio positioning analysis
+3. Tactical allocation recommendations
+4. Emerging opportunities and trends
+5. Next steps and action items"""
+    
+    PORTFOLIO_ANALYSIS_BATCH_INSTRUCTIONS = """Each <CLIENT> section below describes a separate client portfolio. Analyze every portfolio independently.
+
+For each portfolio, """ + PORTFOLIO_ANALYSIS_INSTRUCTIONS[0].lower() + PORTFOLIO_ANALYSIS_INSTRUCTIONS[1:] + """
+
+Respond with only a JSON array containing one object per client, in the order given, each of the form {"client_id": "<id>", "analysis": "<analysis text>"}."""
+    
     def __init__(self, name: str = "PortfolioAnalysisAgent", port: int = 8006):
         self.name = name
         self.port = port
         self.endpoint = f"http://localhost:{port}"
         self.llm_service = get_llm_service()
-        self.active_tasks = {}
+        # Repeated low-temperature analyses of the same portfolio reuse earlier completions
+        self.cache = LLMCache(make_backend(maxsize=1024, prefix="portfolio_llm:"),
+                              ttl_seconds=3600, response_type=LLMResponse)
+        # Near-identical portfolios (same top positions, sector mix to 1%) reuse one completion
+        self.fingerprint_cache = LLMCache(InMemoryLRUBackend(maxsize=FINGERPRINT_CACHE_SIZE), ttl_seconds=3600)
+        # Bounded local task records, mirrored to Redis when REDIS_URL is set so any replica can serve them
+        self.active_tasks = InMemoryLRUBackend(maxsize=TASK_CACHE_SIZE)
+        self.redis = connect_redis()
+        
+        # Compile prompt templates once; formatting loops run inside the compiled templates
+        self.env = jinja2.Environment(
+            loader=jinja2.DictLoader(PROMPT_TEMPLATES),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False
+        )
+        self.env.filters["money"] = _money
+        self.env.filters["percent_of"] = _percent_of
+        self.tmpl_analysis = self.env.get_template("portfolio_analysis")
+        self.tmpl_analysis_compact = self.env.get_template("portfolio_analysis_compact")
+        self.tmpl_commentary = self.env.get_template("market_commentary")
+        self.tmpl_risk = self.env.get_template("risk_assessment")
+        self.tmpl_insights = self.env.get_template("investment_insights")
+        
+        # Coalesce concurrent portfolio analyses into shared LLM calls
+        self.pending_analysis: "queue.Queue[Tuple[str, LLMRequest, Future]]" = queue.Queue()
+        self._batch_thread = threading.Thread(target=self._batch_worker, name="portfolio-analysis-batcher", daemon=True)
+        self._batch_thread.start()
+        self._batch_submitters = ThreadPoolExecutor(max_workers=BATCH_SIZE, thread_name_prefix="portfolio-analysis")
+        # Combined calls run here so the batcher keeps collecting while earlier batches are in flight
+        self._batch_calls = ThreadPoolExecutor(max_workers=BATCH_SIZE, thread_name_prefix="portfolio-analysis-batch")
         
         # Initialize Flask app for A2A communication
         self.app = Flask(__name__)
@@ -39,6 +283,7 @@ class PortfolioAnalysisAgent:
         # Load reference data for context
         self.market_data = self.load_market_data()
         self.client_data = self.load_client_data()
+        self.symbol_to_sector = self.build_sector_lookup()
         
         # Create agent capabilities
         self.agent_card = AgentCard(
@@ -53,6 +298,18 @@ class PortfolioAnalysisAgent:
                     input_schema={"client_id": "string", "analysis_type": "string"},
                     output_schema={"analysis": "string", "insights": "array", "recommendations": "array"}
                 ),
+                AgentCapability(
+                    name="portfolio_analysis_llm_batch",
+                    description="Generate portfolio analyses for several clients in shared AI calls",
+                    input_schema={"clients": "array"},
+                    output_schema={"analyses": "array"}
+                ),
+                AgentCapability(
+                    name="portfolio_detail",
+                    description="Return the full holdings and sector detail behind a compact portfolio analysis",
+                    input_schema={"task_id": "string"},
+                    output_schema={"portfolio_ref": "string", "top_holdings": "array", "sector_distribution": "object"}
+                ),
                 AgentCapability(
                     name="market_commentary",
                     description="Generate market commentary and outlook using AI analysis",
@@ -77,12 +334,29 @@ class PortfolioAnalysisAgent:
         # Setup A2A protocol server
         self.a2a_server = A2AProtocolServer(self.agent_card)
         self.register_handlers()
+        
+        # Pay connection setup and first-call costs at boot rather than on the first request
+        self._warmup()
+    
+    def _warmup(self):
+        """Issue a one-token completion per model tier and run the holdings path once"""
+        for tier in sorted(set(TASK_MODEL_HINTS.values())):
+            try:
+                # Straight to the provider: a cached reply would leave its connections cold.
+                # Resolving the service also settles which provider is available before traffic arrives
+                service = self.llm_service.get_available_service()
+                service.generate(LLMRequest(prompt="ping", max_tokens=1, temperature=0.0, model_hint=tier))
+            except Exception as e:
+                print(f"Warning: LLM warmup for {tier} tier failed: {e}")
+        
+        frame = self._parse_holdings([{"symbol": "", "market_value": 0.0}])
+        self._sector_stats(frame)
     
     def load_market_data(self) -> Dict[str, Any]:
         """Load market data for context"""
         try:
             if os.path.exists('data/market_data.csv'):
-                df = pd.read_csv('data/market_data.csv')
+                df = load_csv('data/market_data.csv')
                 return df.set_index('symbol').to_dict('index')
         except Exception as e:
             print(f"Warning: Could not load market data: {e}")
@@ -92,44 +366,75 @@ class PortfolioAnalysisAgent:
         """Load client data for context"""
         try:
             if os.path.exists('data/clients.csv'):
-                df = pd.read_csv('data/clients.csv')
+                df = load_csv('data/clients.csv')
                 return df.set_index('client_id').to_dict('index')
         except Exception as e:
             print(f"Warning: Could not load client data: {e}")
         return {}
     
+    def build_sector_lookup(self) -> pd.Series:
+        """Build a symbol -> sector Series for vectorized sector mapping"""
+        sectors = {}
+        # market_data.csv carries no sector column; product_info.csv is the sector reference
+        for symbol, info in self.market_data.items():
+            if isinstance(info.get("sector"), str):
+                sectors[symbol] = info["sector"]
+        try:
+            if os.path.exists('data/product_info.csv'):
+                df = load_csv('data/product_info.csv', usecols=['symbol', 'sector'])
+                df = df.dropna().drop_duplicates('symbol')
+                sectors.update(zip(df['symbol'], df['sector']))
+        except Exception as e:
+            print(f"Warning: Could not load product info: {e}")
+        # Categorical keeps one copy of each sector name; "Unknown" is the fill for unmapped symbols
+        lookup = pd.Series(sectors, dtype="category")
+        if "Unknown" not in lookup.cat.categories:
+            lookup = lookup.cat.add_categories("Unknown")
+        return lookup
+    
     def setup_routes(self):
         """Setup Flask routes for A2A communication"""
         
         @self.app.route('/health', methods=['GET'])
         def health_check():
-            return jsonify({
+            return _json_response({
                 "status": "healthy",
                 "agent": self.name,
                 "llm_available": self.llm_service.get_available_service().is_available(),
-                "llm_status": self.llm_service.get_service_status()
+                "llm_status": self.llm_service.get_service_status(),
+                "llm_cache": self.llm_service.get_cache_stats(),
+                "response_cache": self.cache.get_stats(),
+                "fingerprint_cache": self.fingerprint_cache.get_stats()
             })
         
         @self.app.route('/a2a', methods=['POST'])
         def handle_a2a_message():
             try:
-                message_data = request.get_json()
+                message_data = orjson.loads(request.get_data())
+            except orjson.JSONDecodeError as e:
+                return _json_response({
+                    "jsonrpc": "2.0",
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
+                    "id": None
+                }, 400)
+            
+            try:
                 response = self.a2a_server.process_message(message_data)
                 
                 if response:
-                    return jsonify(response)
+                    return _json_response(response)
                 else:
                     return '', 204  # No content for notifications
                     
             except Exception as e:
-                return jsonify({
+                return _json_response({
                     "jsonrpc": "2.0",
                     "error": {
                         "code": -32603,
                         "message": f"Internal error: {str(e)}"
                     },
-                    "id": message_data.get("id")
-                }), 500
+                    "id": message_data.get("id") if isinstance(message_data, dict) else None
+                }, 500)
     
     def register_handlers(self):
         """Register A2A message handlers"""
@@ -142,15 +447,20 @@ class PortfolioAnalysisAgent:
         data = params.get("data", {})
         context = params.get("context", {})
         
-        self.active_tasks[task_id] = {
+        task = {
             "status": "processing",
             "start_time": time.time(),
             "task_type": task_type
         }
+        self._set_task(task_id, task)
         
         try:
             if task_type == "portfolio_analysis_llm":
-                result = self.generate_portfolio_analysis(data, context)
+                result = self.generate_portfolio_analysis(data, context, task_id)
+            elif task_type == "portfolio_detail":
+                result = self.get_portfolio_detail(data.get("task_id", ""))
+            elif task_type == "portfolio_analysis_llm_batch":
+                result = {"analyses": self.generate_portfolio_analysis_batch(data.get("clients", []), context)}
             elif task_type == "market_commentary":
                 result = self.generate_market_commentary(data, context)
             elif task_type == "risk_assessment_llm":
@@ -161,94 +471,129 @@ class PortfolioAnalysisAgent:
                 result = {"error": f"Unknown task type: {task_type}"}
             
             # Update task status
-            self.active_tasks[task_id].update({
+            task = self._get_task(task_id) or task
+            task.update({
                 "status": "completed",
                 "end_time": time.time(),
                 "result": result
             })
+            self._set_task(task_id, task)
             
             return {
                 "task_id": task_id,
                 "status": "completed",
                 "result": result,
-                "processing_time": time.time() - self.active_tasks[task_id]["start_time"],
+                "processing_time": time.time() - task["start_time"],
                 "llm_provider": self.llm_service.get_available_service().get_model_info()["provider"]
             }
             
         except Exception as e:
-            self.active_tasks[task_id].update({
+            task = self._get_task(task_id) or task
+            task.update({
                 "status": "failed",
                 "end_time": time.time(),
                 "error": str(e)
             })
+            self._set_task(task_id, task)
             
             return {
                 "task_id": task_id,
                 "status": "failed",
                 "error": str(e),
-                "processing_time": time.time() - self.active_tasks[task_id]["start_time"]
+                "processing_time": time.time() - task["start_time"]
             }
     
-    def generate_portfolio_analysis(self, data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    def _set_task(self, task_id: str, payload: Dict[str, Any]):
+        """Record a task locally and, when configured, in the shared Redis hash task:<id>"""
+        self.active_tasks.set(task_id, payload, TASK_TTL_SECONDS)
+        if self.redis is not None:
+            key = f"task:{task_id}"
+            pipe = self.redis.pipeline()
+            pipe.hset(key, mapping={field: orjson.dumps(value, default=str, option=_ORJSON_OPTIONS)
+                                    for field, value in payload.items()})
+            pipe.expire(key, TASK_TTL_SECONDS)
+            pipe.execute()
+    
+    def _get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a task record, falling back to Redis for tasks run by another replica"""
+        task = self.active_tasks.get(task_id)
+        if task is None and self.redis is not None:
+            fields = self.redis.hgetall(f"task:{task_id}")
+            if fields:
+                task = {field.decode(): orjson.loads(value) for field, value in fields.items()}
+                self.active_tasks.set(task_id, task, TASK_TTL_SECONDS)
+        return task
+    
+    def generate_portfolio_analysis(self, data: Dict[str, Any], context: Dict[str, Any],
+                                    task_id: Optional[str] = None) -> Dict[str, Any]:
         """Generate comprehensive portfolio analysis using LLM"""
         client_id = data.get("client_id")
         holdings = data.get("holdings", [])
         
         # Prepare portfolio summary for LLM context
-        total_value = sum(float(h.get("market_value", 0)) for h in holdings)
+        frame = self._parse_holdings(holdings)
+        values = frame["market_value"].to_numpy()
+        total_value = float(values.sum())
         num_holdings = len(holdings)
-        top_holdings = sorted(holdings, key=lambda x: float(x.get("market_value", 0)), reverse=True)[:10]
+        top_holdings = [holdings[i] for i in self._top_indices(values, 10)]
         
         # Create sector distribution
-        sectors = {}
-        for holding in holdings:
-            symbol = holding.get("symbol", "")
-            market_info = self.market_data.get(symbol, {})
-            sector = market_info.get("sector", "Unknown")
-            sectors[sector] = sectors.get(sector, 0) + float(holding.get("market_value", 0))
+        sector_stats = self._sector_stats(frame)
         
         # Get client information
         client_info = self.client_data.get(client_id, {})
         client_name = client_info.get("client_name", client_id)
         
-        # Construct LLM prompt
-        prompt = f"""
-        Please analyze the following portfolio for {client_name} (ID: {client_id}):
-        
-        Portfolio Summary:
-        - Total Portfolio Value: ${total_value:,.2f}
-        - Number of Holdings: {num_holdings}
-        - Client Type: {self._classify_client_type(client_name)}
-        
-        Top 10 Holdings:
-        {self._format_holdings_for_prompt(top_holdings[:10])}
+        client_type = self._classify_client_type(client_name)
         
-        Sector Distribution:
-        {self._format_sectors_for_prompt(sectors)}
-        
-        Please provide:
-        1. Overall portfolio assessment
-        2. Strengths and potential concerns
-        3. Diversification analysis
-        4. Strategic recommendations
-        5. Risk considerations
-        
-        Focus on institutional-level analysis appropriate for this client type.
-        """
+        # Full listings stay with the task; the prompt only inlines them for detailed analyses
+        portfolio_ref = f"{client_id}_{time.strftime('%Y%m%d')}"
+        task = self._get_task(task_id) if task_id is not None else None
+        if task is not None:
+            task["portfolio_detail"] = {
+                "portfolio_ref": portfolio_ref,
+                "top_holdings": top_holdings[:10],
+                "sector_distribution": sector_stats.as_dict()
+            }
+            self._set_task(task_id, task)
         
-        system_prompt = "You are a senior portfolio analyst with expertise in institutional investment management. Provide professional, data-driven analysis with specific insights and actionable recommendations."
+        # Construct LLM prompt
+        if data.get("analysis_type", context.get("analysis_type")) == "detailed":
+            prompt = self.tmpl_analysis.render(
+                client_name=client_name,
+                client_id=client_id,
+                total_value=total_value,
+                num_holdings=num_holdings,
+                client_type=client_type,
+                top_holdings=top_holdings[:10],
+                sector_stats=sector_stats
+            )
+        else:
+            prompt = self.tmpl_analysis_compact.render(
+                client_name=client_name,
+                client_id=client_id,
+                total_value=total_value,
+                num_holdings=num_holdings,
+                client_type=client_type,
+                portfolio_ref=portfolio_ref,
+                composition=self._summarize_portfolio_compact(
+                    top_holdings, total_value, num_holdings, sector_stats)
+            )
         
         # Generate analysis using LLM
-        llm_response = generate_text(
+        llm_response = self._cached_generate(
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=self.PORTFOLIO_ANALYSIS_SYSTEM_PROMPT,
+            instructions=self.PORTFOLIO_ANALYSIS_INSTRUCTIONS,
             max_tokens=1500,
-            temperature=0.3,
+            temperature=0.0 if DETERMINISTIC_ANALYSIS else 0.3,
             context={
                 "total_value": total_value,
                 "num_holdings": num_holdings,
-                "client_type": self._classify_client_type(client_name)
-            }
+                "client_type": client_type
+            },
+            model_hint=TASK_MODEL_HINTS["portfolio_analysis_llm"],
+            batch_label=str(client_id)
         )
         
         return {
@@ -258,7 +603,7 @@ class PortfolioAnalysisAgent:
                 "total_value": total_value,
                 "num_holdings": num_holdings,
                 "top_holdings": top_holdings[:5],
-                "sector_distribution": sectors
+                "sector_distribution": sector_stats.as_dict()
             },
             "llm_analysis": llm_response.content,
             "analysis_metadata": {
@@ -270,44 +615,44 @@ class PortfolioAnalysisAgent:
             }
         }
     
+    def get_portfolio_detail(self, task_id: str) -> Dict[str, Any]:
+        """Look up the holdings detail recorded for a portfolio analysis task"""
+        detail = (self._get_task(task_id) or {}).get("portfolio_detail")
+        if detail is None:
+            return {"error": f"No portfolio detail for task: {task_id}"}
+        return detail
+    
+    def generate_portfolio_analysis_batch(self, clients: List[Dict[str, Any]], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Analyze several client portfolios, sharing LLM calls between them"""
+        # Each analysis blocks on its queued request, so run them side by side to fill a batch
+        return list(self._batch_submitters.map(
+            lambda data: self.generate_portfolio_analysis(data, context), clients))
+    
     def generate_market_commentary(self, data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Generate market commentary using LLM"""
         holdings = data.get("holdings", [])
         market_conditions = data.get("market_conditions", {})
         
-        # Analyze portfolio exposure
-        sectors_exposure = self._calculate_sector_exposure(holdings)
-        major_positions = [h for h in holdings if float(h.get("market_value", 0)) > 10000000]  # >$10M positions
-        
-        prompt = f"""
-        Provide market commentary and outlook based on the following portfolio exposure:
+        # Analyze portfolio exposure from one pass over the holdings
+        frame = self._parse_holdings(holdings)
+        sector_stats = self._sector_stats(frame)
+        major_positions = [holdings[i] for i in np.flatnonzero(frame["market_value"].to_numpy() > 10000000)]  # >$10M positions
         
-        Major Sector Exposures:
-        {self._format_sectors_for_prompt(sectors_exposure)}
+        prompt = self.tmpl_commentary.render(sector_stats=sector_stats, major_positions=major_positions)
         
-        Significant Positions (>$10M):
-        {self._format_holdings_for_prompt(major_positions)}
-        
-        Please provide:
-        1. Current market environment assessment
-        2. Sector-specific outlook based on portfolio exposure
-        3. Key risks and opportunities
-        4. Short-term and medium-term market outlook
-        5. Positioning recommendations
-        """
-        
-        system_prompt = "You are a senior market strategist providing institutional-level market commentary. Focus on actionable insights and strategic positioning advice."
-        
-        llm_response = generate_text(
+        llm_response = self._cached_generate(
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=self.MARKET_COMMENTARY_SYSTEM_PROMPT,
+            instructions=self.MARKET_COMMENTARY_INSTRUCTIONS,
             max_tokens=1200,
-            temperature=0.4
+            temperature=0.4,
+            model_hint=TASK_MODEL_HINTS["market_commentary"],
+            fingerprint=self._portfolio_fingerprint("market_commentary", frame, sector_stats)
         )
         
         return {
             "market_commentary": llm_response.content,
-            "sector_exposure": sectors_exposure,
+            "sector_exposure": sector_stats.as_dict(),
             "major_positions_count": len(major_positions),
             "commentary_metadata": {
                 "provider": llm_response.provider,
@@ -323,37 +668,31 @@ class PortfolioAnalysisAgent:
         holdings = portfolio_data.get("holdings", [])
         
         # Calculate basic risk metrics
-        total_value = sum(float(h.get("market_value", 0)) for h in holdings)
-        concentration_risk = self._calculate_concentration_risk(holdings, total_value)
-        sector_concentration = self._calculate_sector_concentration(holdings)
-        
-        prompt = f"""
-        Assess the risk profile of this portfolio:
-        
-        Portfolio Characteristics:
-        - Total Value: ${total_value:,.2f}
-        - Number of Holdings: {len(holdings)}
-        - Top 10 Concentration: {concentration_risk['top_10_percentage']:.1f}%
-        - Largest Single Position: {concentration_risk['largest_position_percentage']:.1f}%
-        
-        Sector Concentration Analysis:
-        {self._format_concentration_analysis(sector_concentration)}
-        
-        Please provide:
-        1. Overall risk assessment and risk score (1-10, where 10 is highest risk)
-        2. Key risk factors and concerns
-        3. Concentration risk analysis
-        4. Diversification effectiveness
-        5. Risk mitigation recommendations
-        """
-        
-        system_prompt = "You are a senior risk analyst specializing in institutional portfolio risk assessment. Provide quantitative insights and specific risk management recommendations."
+        frame = self._parse_holdings(holdings)
+        total_value = float(frame["market_value"].sum())
+        concentration_risk = self._calculate_concentration_risk(frame, total_value)
+        sector_stats = self._sector_stats(frame)
+        sector_concentration = self._calculate_sector_concentration(sector_stats)
+        
+        prompt = self.tmpl_risk.render(
+            total_value=total_value,
+            num_holdings=len(holdings),
+            concentration=concentration_risk,
+            sector_concentration=sector_concentration
+        )
         
-        llm_response = generate_text(
+        llm_response = self._cached_generate(
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=self.RISK_ASSESSMENT_SYSTEM_PROMPT,
+            instructions=self.RISK_ASSESSMENT_INSTRUCTIONS,
             max_tokens=1300,
-            temperature=0.2
+            temperature=0.0 if DETERMINISTIC_ANALYSIS else 0.2,
+            model_hint=TASK_MODEL_HINTS["risk_assessment_llm"],
+            # Weights matter for risk: the prompt quotes both concentration figures
+            fingerprint=self._portfolio_fingerprint("risk_assessment_llm", frame, sector_stats) + (
+                round(concentration_risk["top_10_percentage"]),
+                round(concentration_risk["largest_position_percentage"])
+            )
         )
         
         return {
@@ -377,32 +716,25 @@ class PortfolioAnalysisAgent:
         portfolio_summary = data.get("portfolio_summary", {})
         objectives = data.get("objectives", "growth and income")
         
-        prompt = f"""
-        Provide strategic investment insights for this institutional portfolio:
-        
-        Portfolio Overview:
-        - Total Assets: ${portfolio_summary.get('total_value', 0):,.2f}
-        - Holdings Count: {portfolio_summary.get('num_holdings', 0)}
-        - Investment Objectives: {objectives}
-        
-        Current Allocation Summary:
-        {self._format_portfolio_summary(portfolio_summary)}
-        
-        Please provide:
-        1. Strategic investment insights and themes
-        2. Portfolio positioning analysis
-        3. Tactical allocation recommendations
-        4. Emerging opportunities and trends
-        5. Next steps and action items
-        """
+        # Only the five largest sectors are listed, so select them without sorting the rest
+        top_sectors = None
+        sector_total = 1
+        if "sector_distribution" in portfolio_summary:
+            sectors = portfolio_summary["sector_distribution"] or {}
+            if sectors:
+                sector_total = sum(sectors.values())
+            top_sectors = nlargest(5, sectors.items(), key=itemgetter(1))
         
-        system_prompt = "You are a senior investment strategist providing institutional-level strategic guidance. Focus on strategic themes, positioning insights, and actionable recommendations."
+        prompt = self.tmpl_insights.render(summary=portfolio_summary, objectives=objectives,
+                                           top_sectors=top_sectors, sector_total=sector_total)
         
-        llm_response = generate_text(
+        llm_response = self._cached_generate(
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=self.INVESTMENT_INSIGHTS_SYSTEM_PROMPT,
+            instructions=self.INVESTMENT_INSIGHTS_INSTRUCTIONS,
             max_tokens=1400,
-            temperature=0.5
+            temperature=0.5,
+            model_hint=TASK_MODEL_HINTS["investment_insights"]
         )
         
         return {
@@ -417,54 +749,217 @@ class PortfolioAnalysisAgent:
             }
         }
     
-    def _classify_client_type(self, client_name: str) -> str:
+    def _cached_generate(self, prompt: str, system_prompt: str, max_tokens: int,
+                         temperature: float, context: Dict[str, Any] = None,
+                         instructions: str = None, model_hint: Optional[str] = None,
+                         batch_label: Optional[str] = None, fingerprint: Optional[Tuple] = None) -> LLMResponse:
+        """Generate text through the response cache when the temperature allows reuse"""
+        llm_request = LLMRequest(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            instructions=instructions,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            context=context,
+            model_hint=model_hint
+        )
+        
+        # Labelled requests wait for the batch worker instead of calling the LLM directly,
+        # but only when the active service can answer with the structured per-client array
+        if batch_label is not None and self.llm_service.get_available_service().supports_structured_output:
+            generate = lambda req: self._submit_batched(batch_label, req)
+        else:
+            generate = self.llm_service.generate
+        
+        # Higher temperatures are asked for variety, so never replay them
+        if temperature > CACHE_MAX_TEMPERATURE:
+            return generate(llm_request)
+        
+        model = self.llm_service.get_available_service().resolve_model(llm_request)
+        key = self.cache.make_key(model, llm_request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return replace(cached, processing_time=0.0)
+        
+        if fingerprint is not None:
+            fingerprint = (llm_request.system_prompt, llm_request.instructions) + fingerprint
+            similar = self.fingerprint_cache.get(repr((model,) + fingerprint))
+            if similar is not None:
+                return replace(similar, processing_time=0.0)
+        
+        llm_response = generate(llm_request)
+        if llm_response.success:
+            # File under the model that actually answered, in case the manager fell back
+            if llm_response.model != model:
+                key = self.cache.make_key(llm_response.model, llm_request)
+            self.cache.set(key, llm_response)
+            if fingerprint is not None:
+                self.fingerprint_cache.set(repr((llm_response.model,) + fingerprint), llm_response)
+        return llm_response
+    
+    def _submit_batched(self, label: str, llm_request: LLMRequest) -> LLMResponse:
+        """Queue a portfolio analysis request for the batch worker and wait for its response"""
+        future: Future = Future()
+        self.pending_analysis.put((label, llm_request, future))
+        try:
+            llm_response = future.result(timeout=BATCH_RESULT_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            print(f"Warning: Batched analysis for {label} timed out; generating it individually")
+            llm_response = None
+        if llm_response is None:
+            # Not answered by the batch; generate on this request's own thread, alongside the others
+            llm_response = self.llm_service.generate(llm_request)
+        return llm_response
+    
+    def _batch_worker(self):
+        """Collect queued analyses for up to BATCH_WINDOW_MS and answer them together"""
+        while True:
+            batch = [self.pending_analysis.get()]
+            deadline = time.monotonic() + BATCH_WINDOW_MS / 1000
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending_analysis.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            if len(batch) == 1:
+                # Nothing to combine; the requester makes its own call
+                batch[0][2].set_result(None)
+            else:
+                self._batch_calls.submit(self._answer_batch, batch)
+    
+    def _answer_batch(self, batch: List[Tuple[str, LLMRequest, Future]]):
+        """Resolve every future in a batch, with None for analyses the requester must generate itself"""
+        try:
+            responses = self._generate_batch(batch)
+        except Exception as e:
+            print(f"Warning: Batched portfolio analysis failed: {e}")
+            responses = [None] * len(batch)
+        for (_, _, future), llm_response in zip(batch, responses):
+            future.set_result(llm_response)
+    
+    def _generate_batch(self, batch: List[Tuple[str, LLMRequest, Future]]) -> List[Optional[LLMResponse]]:
+        """Answer a batch of analyses with one LLM call; None marks sections it did not answer"""
+        
+        sections = "\n\n".join(
+            f'<CLIENT id="{label}">\n{llm_request.prompt.strip()}\n</CLIENT>'
+            for label, llm_request, _ in batch
+        )
+        first_request = batch[0][1]
+        combined = self.llm_service.generate(LLMRequest(
+            prompt=sections,
+            system_prompt=first_request.system_prompt,
+            instructions=self.PORTFOLIO_ANALYSIS_BATCH_INSTRUCTIONS,
+            max_tokens=min(sum(llm_request.max_tokens for _, llm_request, _ in batch), BATCH_MAX_TOKENS),
+            temperature=first_request.temperature,
+            model_hint=first_request.model_hint
+        ))
+        analyses = self._parse_batch_analyses(combined.content) if combined.success else []
+        
+        responses = []
+        for position, (label, _, _) in enumerate(batch):
+            entry = analyses[position] if position < len(analyses) else None
+            if entry is not None and str(entry.get("client_id")) == label and entry.get("analysis"):
+                responses.append(LLMResponse(
+                    content=str(entry["analysis"]),
+                    provider=combined.provider,
+                    model=combined.model,
+                    tokens_used=combined.tokens_used // len(batch),
+                    processing_time=combined.processing_time,
+                    success=True
+                ))
+            else:
+                # Missing or malformed section; the requester asks for this portfolio on its own
+                responses.append(None)
+        return responses
+    
+    def _parse_batch_analyses(self, content: str) -> List[Dict[str, Any]]:
+        """Extract the per-client JSON array from a batched completion"""
+        start = content.find("[")
+        end = content.rfind("]")
+        if start < 0 or end <= start:
+            return []
+        try:
+            analyses = json.loads(content[start:end + 1])
+        except ValueError:
+            return []
+        if not isinstance(analyses, list):
+            return []
+        return [entry if isinstance(entry, dict) else {} for entry in analyses]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _classify_client_type(client_name: str) -> str:
         """Classify client type based on name"""
-        name_lower = client_name.lower()
-        if any(word in name_lower for word in ['pension', 'retirement', 'calpers']):
-            return "Pension Fund"
-        elif any(word in name_lower for word in ['capital', 'partners', 'management', 'fund']):
-            return "Hedge Fund / Private Equity"
-        elif any(word in name_lower for word in ['asset management', 'investments', 'advisors']):
-            return "Asset Management"
+        ranked = [_CLIENT_TYPE_KEYWORDS[match.lower()] for match in _CLIENT_TYPE_RE.findall(client_name)]
+        if ranked:
+            return min(ranked)[1]
+        return "Institutional Investor"
+    
+    def _summarize_portfolio_compact(self, top_holdings: List[Dict], total_value: float,
+                                     num_holdings: int, sector_stats: SectorStats, top_n: int = 3) -> str:
+        """One-line digest of the largest positions, sectors and concentration"""
+        positions = ", ".join(
+            f"{holding.get('symbol', '')} {_percent_of(float(holding.get('market_value', 0)), total_value)}"
+            for holding in top_holdings[:top_n]
+        )
+        sectors = ", ".join(
+            f"{sector} {_percent_of(value, sector_stats.total)}"
+            for sector, value in sector_stats.ranked()[:top_n]
+        )
+        return (f"Top{top_n}: {positions}; Sectors: {sectors}; "
+                f"HHI {sector_stats.hhi:.2f}; N={num_holdings}")
+    
+    def _portfolio_fingerprint(self, task_type: str, frame: pd.DataFrame, sector_stats: SectorStats) -> Tuple:
+        """Quantized portfolio shape: top 5 symbols, sector mix to 1%, value to two significant figures"""
+        values = frame["market_value"].to_numpy()
+        symbols = frame["symbol"].to_numpy()
+        top_symbols = tuple(str(symbols[i]) for i in self._top_indices(values, 5))
+        sector_mix = tuple((str(sector), round(value / sector_stats.total * 100) if sector_stats.total > 0 else 0)
+                           for sector, value in sector_stats.ranked())
+        return (task_type, top_symbols, sector_mix, f"{sector_stats.total:.2g}", len(frame))
+    
+    def _parse_holdings(self, holdings: List[Dict]) -> pd.DataFrame:
+        """Parse holdings once into aligned symbol, market value and sector columns"""
+        df = pd.DataFrame(holdings, columns=["symbol", "market_value"])
+        df["market_value"] = pd.to_numeric(df["market_value"], errors="coerce").fillna(0.0)
+        df["sector"] = df["symbol"].map(self.symbol_to_sector).fillna("Unknown")
+        return df
+    
+    def _sector_stats(self, frame: pd.DataFrame) -> SectorStats:
+        """Aggregate holdings by sector once, with the ordering and HHI every consumer needs"""
+        grouped = frame.groupby("sector", sort=False, observed=True)["market_value"].sum()
+        values = grouped.to_numpy(dtype=np.float64)
+        total = float(values.sum())
+        
+        # Herfindahl-Hirschman Index for sector concentration
+        hhi = float(((values / total) ** 2).sum()) if total > 0 else 0
+        
+        return SectorStats(
+            names=grouped.index.to_numpy(dtype=object),
+            values=values,
+            total=total,
+            hhi=hhi,
+            sorted_idx=np.argsort(-values, kind="stable")
+        )
+    
+    def _top_indices(self, values: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k largest values, largest first, without sorting the rest"""
+        if len(values) > k:
+            candidates = np.argpartition(-values, k - 1)[:k]
         else:
-            return "Institutional Investor"
-    
-    def _format_holdings_for_prompt(self, holdings: List[Dict]) -> str:
-        """Format holdings data for LLM prompt"""
-        lines = []
-        for i, holding in enumerate(holdings, 1):
-            symbol = holding.get("symbol", "")
-            market_value = float(holding.get("market_value", 0))
-            lines.append(f"{i}. {symbol}: ${market_value:,.0f}")
-        return "\n".join(lines)
-    
-    def _format_sectors_for_prompt(self, sectors: Dict[str, float]) -> str:
-        """Format sector distribution for LLM prompt"""
-        sorted_sectors = sorted(sectors.items(), key=lambda x: x[1], reverse=True)
-        lines = []
-        total = sum(sectors.values())
-        for sector, value in sorted_sectors:
-            percentage = (value / total) * 100 if total > 0 else 0
-            lines.append(f"- {sector}: ${value:,.0f} ({percentage:.1f}%)")
-        return "\n".join(lines)
-    
-    def _calculate_sector_exposure(self, holdings: List[Dict]) -> Dict[str, float]:
-        """Calculate sector exposure from holdings"""
-        sectors = {}
-        for holding in holdings:
-            symbol = holding.get("symbol", "")
-            market_info = self.market_data.get(symbol, {})
-            sector = market_info.get("sector", "Unknown")
-            value = float(holding.get("market_value", 0))
-            sectors[sector] = sectors.get(sector, 0) + value
-        return sectors
-    
-    def _calculate_concentration_risk(self, holdings: List[Dict], total_value: float) -> Dict[str, Any]:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(-values[candidates], kind="stable")]
+    
+    def _calculate_concentration_risk(self, frame: pd.DataFrame, total_value: float) -> Dict[str, Any]:
         """Calculate concentration risk metrics"""
-        sorted_holdings = sorted(holdings, key=lambda x: float(x.get("market_value", 0)), reverse=True)
+        values = frame["market_value"].to_numpy()
         
-        top_10_value = sum(float(h.get("market_value", 0)) for h in sorted_holdings[:10])
-        largest_position_value = float(sorted_holdings[0].get("market_value", 0)) if sorted_holdings else 0
+        top_10_value = float(values[self._top_indices(values, 10)].sum())
+        largest_position_value = float(values.max(initial=0.0))
         
         return {
             "top_10_percentage": (top_10_value / total_value) * 100 if total_value > 0 else 0,
@@ -473,46 +968,15 @@ class PortfolioAnalysisAgent:
             "largest_position_value": largest_position_value
         }
     
-    def _calculate_sector_concentration(self, holdings: List[Dict]) -> Dict[str, Any]:
+    def _calculate_sector_concentration(self, stats: SectorStats) -> Dict[str, Any]:
         """Calculate sector concentration"""
-        sectors = self._calculate_sector_exposure(holdings)
-        total_value = sum(sectors.values())
-        
-        # Calculate Herfindahl-Hirschman Index for sector concentration
-        hhi = sum((value / total_value) ** 2 for value in sectors.values()) if total_value > 0 else 0
-        
         return {
-            "herfindahl_index": hhi,
-            "num_sectors": len(sectors),
-            "largest_sector_percentage": max(sectors.values()) / total_value * 100 if total_value > 0 else 0,
-            "sector_distribution": sectors
+            "herfindahl_index": stats.hhi,
+            "num_sectors": len(stats.names),
+            "largest_sector_percentage": stats.largest_percentage,
+            "sector_distribution": stats.as_dict()
         }
     
-    def _format_concentration_analysis(self, concentration: Dict[str, Any]) -> str:
-        """Format concentration analysis for prompt"""
-        return f"""
-        - Herfindahl Index: {concentration['herfindahl_index']:.3f}
-        - Number of Sectors: {concentration['num_sectors']}
-        - Largest Sector: {concentration['largest_sector_percentage']:.1f}%
-        """
-    
-    def _format_portfolio_summary(self, summary: Dict[str, Any]) -> str:
-        """Format portfolio summary for prompt"""
-        lines = [
-            f"Total Value: ${summary.get('total_value', 0):,.2f}",
-            f"Holdings: {summary.get('num_holdings', 0)} positions"
-        ]
-        
-        if "sector_distribution" in summary:
-            lines.append("Top Sectors:")
-            sectors = summary["sector_distribution"]
-            total = sum(sectors.values()) if sectors else 1
-            for sector, value in sorted(sectors.items(), key=lambda x: x[1], reverse=True)[:5]:
-                pct = (value / total) * 100
-                lines.append(f"  - {sector}: {pct:.1f}%")
-        
-        return "\n".join(lines)
-    
     def run(self):
         """Start the agent server"""
         print(f"Starting {self.name} on port {self.port}")
@@ -521,10 +985,29 @@ class PortfolioAnalysisAgent:
         print(f"Available capabilities: {[cap.name for cap in self.agent_card.capabilities]}")
         
         try:
-            self.app.run(host='0.0.0.0', port=self.port, debug=False)
+            # One thread per request so slow LLM calls overlap and can share batches
+            self.app.run(host='0.0.0.0', port=self.port, debug=False, threaded=True)
         except KeyboardInterrupt:
             print(f"\n{self.name} shutting down...")
 
+def create_app() -> Flask:
+    """Build the agent and return its Flask app for a WSGI server"""
+    return PortfolioAnalysisAgent().app
+
+def run_prod(port: int = 8006, threads: int = PROD_THREADS):
+    """Replace this process with gunicorn serving the agent from threaded workers"""
+    # One worker keeps the batch queue and local caches shared; set REDIS_URL before adding workers
+    args = ["gunicorn", "-w", "1", "--worker-class", "gthread", "--threads", str(threads),
+            "-b", f"0.0.0.0:{port}", "portfolio_analysis_agent:create_app()"]
+    try:
+        os.execvp("gunicorn", args)
+    except FileNotFoundError:
+        print("Warning: gunicorn not installed, falling back to the Flask development server")
+        PortfolioAnalysisAgent(port=port).run()
+
 if __name__ == "__main__":
-    agent = PortfolioAnalysisAgent()
-    agent.run()
\ No newline at end of file
+    if "--prod" in sys.argv:
+        run_prod()
+    else:
+        agent = PortfolioAnalysisAgent()
+        agent.run()
\ No newline at end of file
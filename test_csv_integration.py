@@ -4,35 +4,55 @@ Test script to verify A2A agents are working with CSV data loading
 """
 
 import json
+import orjson
+import requests
 import time
 import subprocess
-import requests
 import threading
 from typing import Dict, Any
+from a2a_protocol import create_pooled_session
 
 class A2ATestClient:
     """Test client for A2A protocol communication"""
     
+    # Static part of every JSON-RPC envelope, encoded once
+    _ENVELOPE_PREFIX = b'{"jsonrpc":"2.0","method":'
+    _JSON_HEADERS = {"Content-Type": "application/json"}
+    
     def __init__(self):
+        self.session = create_pooled_session()
         self.agent_processes = {}
+        # Endpoints that refused a connection are skipped for the rest of the run
+        self.offline_endpoints = set()
         self.agent_endpoints = {
             "ClientDataAgent": "http://localhost:8003",
             "FinancialDataAgent": "http://localhost:8004", 
             "ChartGenerationAgent": "http://localhost:8005"
         }
     
+    def encode_a2a_message(self, method: str, params: Dict[str, Any] = None, message_id: str = "test_1") -> bytes:
+        """Encode an A2A protocol message body, reusable across agents"""
+        return b"".join((
+            self._ENVELOPE_PREFIX, orjson.dumps(method),
+            b',"id":', orjson.dumps(message_id),
+            b',"params":', orjson.dumps(params or {}), b"}"
+        ))
+    
     def send_a2a_message(self, endpoint: str, method: str, params: Dict[str, Any] = None, message_id: str = "test_1") -> Dict[str, Any]:
         """Send A2A protocol message to an agent"""
-        message = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params or {},
-            "id": message_id
-        }
+        return self.post_a2a_body(endpoint, self.encode_a2a_message(method, params, message_id))
+    
+    def post_a2a_body(self, endpoint: str, body: bytes, timeout: float = 10) -> Dict[str, Any]:
+        """Post a pre-encoded A2A protocol message to an agent"""
+        if endpoint in self.offline_endpoints:
+            return {"error": f"Agent at {endpoint} is offline"}
         
         try:
-            response = requests.post(f"{endpoint}/a2a", json=message, timeout=10)
-            return response.json()
+            response = self.session.post(f"{endpoint}/a2a", data=body, headers=self._JSON_HEADERS, timeout=timeout)
+            return orjson.loads(response.content)
+        except requests.ConnectionError as e:
+            self.offline_endpoints.add(endpoint)
+            return {"error": f"Communication failed: {str(e)}"}
         except Exception as e:
             return {"error": f"Communication failed: {str(e)}"}
     
@@ -41,11 +61,14 @@ class A2ATestClient:
         print("Testing Agent Capabilities with CSV Data...")
         print("=" * 60)
         
+        # Every agent gets the same request, so encode it once
+        capabilities_body = self.encode_a2a_message("get_capabilities")
+        
         for agent_name, endpoint in self.agent_endpoints.items():
             print(f"\nTesting {agent_name}...")
             
             # Test capabilities
-            capabilities_response = self.send_a2a_message(endpoint, "get_capabilities")
+            capabilities_response = self.post_a2a_body(endpoint, capabilities_body, timeout=3)
             if "result" in capabilities_response:
                 print(f"  [SUCCESS] Capabilities: {capabilities_response['result']['capabilities']}")
             else:
@@ -122,65 +145,39 @@ class A2ATestClient:
         print("\n\nTesting Complete Portfolio Analysis Workflow...")
         print("=" * 60)
         
-        # Step 1: Get aggregated holdings from ClientDataAgent
-        print("\n[STEP 1] Getting aggregated client holdings...")
-        aggregated_response = self.send_a2a_message(
-            self.agent_endpoints["ClientDataAgent"],
+        # Aggregation, valuation and charting run as one pipeline task on ChartGenerationAgent
+        print("\n[PIPELINE] Aggregating holdings, calculating market values and generating chart...")
+        pipeline_response = self.send_a2a_message(
+            self.agent_endpoints["ChartGenerationAgent"],
             "execute_task",
             {
-                "task_type": "aggregate_holdings",
+                "task_type": "run_portfolio_pipeline",
                 "task_id": "workflow_1",
-                "data": {}
+                "data": {"chart_type": "top_holdings"}
             }
         )
         
-        if "result" not in aggregated_response or "result" not in aggregated_response["result"]:
-            print(f"  [FAILED] Failed to get aggregated holdings: {aggregated_response}")
+        if "result" not in pipeline_response or "result" not in pipeline_response["result"]:
+            print(f"  [FAILED] Portfolio pipeline failed: {pipeline_response}")
             return
         
-        holdings_data = aggregated_response["result"]["result"]
+        pipeline = pipeline_response["result"]["result"]
+        holdings_data = pipeline["holdings"]
         print(f"  [SUCCESS] Got {holdings_data['unique_symbols']} unique symbols across all clients")
         
-        # Step 2: Calculate market values using FinancialDataAgent
-        print("\n[STEP 2] Calculating market values...")
-        market_values_response = self.send_a2a_message(
-            self.agent_endpoints["FinancialDataAgent"],
-            "execute_task",
-            {
-                "task_type": "calculate_market_values",
-                "task_id": "workflow_2", 
-                "data": {"aggregated_holdings": holdings_data["aggregated_holdings"]}
-            }
-        )
-        
-        if "result" not in market_values_response or "result" not in market_values_response["result"]:
-            print(f"  [FAILED] Failed to calculate market values: {market_values_response}")
-            return
-        
-        portfolio_data = market_values_response["result"]["result"]
+        portfolio_data = pipeline["portfolio_data"]
         print(f"  [SUCCESS] Total portfolio value: ${portfolio_data['total_portfolio_value']:,.2f}")
-        print(f"  Top 5 holdings:")
-        for i, holding in enumerate(portfolio_data['top_10_holdings'][:5]):
-            print(f"    {i+1}. {holding['symbol']}: ${holding['market_value']:,.2f} ({holding['portfolio_percentage']:.1f}%)")
-        
-        # Step 3: Generate chart using ChartGenerationAgent
-        print("\n[STEP 3] Generating portfolio analysis chart...")
-        chart_response = self.send_a2a_message(
-            self.agent_endpoints["ChartGenerationAgent"],
-            "execute_task",
-            {
-                "task_type": "generate_top_holdings_chart",
-                "task_id": "workflow_3",
-                "data": {"portfolio_data": portfolio_data}
-            }
-        )
+        print("  Top 5 holdings:\n" + "\n".join(
+            f"    {i}. {holding['symbol']}: ${holding['market_value']:,.2f} ({holding['portfolio_percentage']:.1f}%)"
+            for i, holding in enumerate(portfolio_data['top_10_holdings'][:5], 1)
+        ))
         
-        if "result" in chart_response and "result" in chart_response["result"]:
-            chart_data = chart_response["result"]["result"]
+        chart_data = pipeline["chart"]
+        if "error" not in chart_data:
             print(f"  [SUCCESS] Generated chart: {chart_data.get('chart_type', 'Unknown')} chart")
-            print(f"  Chart contains {len(chart_data.get('chart_json', {}).get('data', []))} data series")
+            print(f"  Chart contains {len(json.loads(chart_data.get('chart_json', '{}')).get('data', []))} data series")
         else:
-            print(f"  [FAILED] Failed to generate chart: {chart_response}")
+            print(f"  [FAILED] Failed to generate chart: {chart_data}")
     
     def run_tests(self):
         """Run all tests"""
@@ -4,79 +4,187 @@ Interactive dashboard to visualize agent communication
 """
 
 from flask import Flask, render_template, jsonify, request
+from flask.json.provider import JSONProvider
+import os
+import sys
 import json
+import orjson
 import time
 import threading
-import requests
+import functools
 import concurrent.futures
-from datetime import datetime
-from a2a_protocol import A2AProtocolClient
+from collections import deque
+from a2a_protocol import A2AProtocolClient, create_pooled_session
+from llm_cache import InMemoryLRUBackend
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by every jsonify and get_json call"""
+    
+    options = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.options).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response without a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.options), mimetype="application/json")
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# How long slow-changing agent responses are reused before asking the agent again
+CAPABILITIES_TTL_SECONDS = 3600
+CACHEABLE_TASK_TTLS = {
+    "get_market_data": 60,
+    "get_product_info": 3600
+}
+# Recent protocol messages kept for the dashboard
+MESSAGE_LOG_SIZE = 50
+# Seconds between background agent health sweeps, and how long one check may take
+STATUS_REFRESH_SECONDS = 3
+HEALTH_CHECK_TIMEOUT_SECONDS = 0.2
+# Consecutive failed probes before calls to an agent fail fast
+OFFLINE_AFTER_FAILED_PROBES = 2
+# Concurrent agent calls for status sweeps and capability discovery
+FANOUT_WORKERS = int(os.getenv("A2A_FANOUT_WORKERS", "10"))
+# Request threads per gunicorn worker in production mode
+PROD_THREADS = 16
+# Werkzeug debugger and reloader for local development only
+DEV_MODE = os.getenv("DEV", "").lower() in ("1", "true", "yes")
+
+@functools.lru_cache(maxsize=64)
+def _format_hms(seconds: int) -> str:
+    """HH:MM:SS for a whole epoch second, formatted once per second seen"""
+    return time.strftime("%H:%M:%S", time.localtime(seconds))
+
+def _now_hms() -> str:
+    """Current local time as HH:MM:SS"""
+    return _format_hms(int(time.time()))
 
 class A2AWebUI:
     """Web interface for A2A protocol demonstration"""
     
     def __init__(self):
         self.client = A2AProtocolClient()
-        self.message_log = []
+        # Health probes keep their own connections without retries, so one probe costs one timeout
+        self.session = create_pooled_session(pool_maxsize=FANOUT_WORKERS, retries=0)
+        # Long-lived workers for fanning calls out to every agent at once
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="a2a-fanout")
+        # Bounded log; the oldest entry drops off as each new one arrives
+        self.message_log = deque(maxlen=MESSAGE_LOG_SIZE)
+        self._log_lock = threading.Lock()
+        # Capability cards and reference-data task results, keyed per agent and request
+        self.response_cache = InMemoryLRUBackend(maxsize=256)
         self.agent_status = {}
+        # Failed probes in a row per agent, reset by any successful probe
+        self.probe_failures = {}
         self.known_agents = {
             "DataProcessor": "http://localhost:8002",
             "ClientDataAgent": "http://localhost:8003",
             "FinancialDataAgent": "http://localhost:8004",
             "ChartGenerationAgent": "http://localhost:8005"
         }
-        
+        # Health is swept in the background; the status route only reads the last snapshot
+        threading.Thread(target=self._status_loop, name="agent-status", daemon=True).start()
+    
+    def _status_loop(self):
+        """Refresh agent status every STATUS_REFRESH_SECONDS"""
+        while True:
+            try:
+                self.check_all_agents_status()
+            except Exception as e:
+                print(f"Agent status sweep failed: {e}")
+            time.sleep(STATUS_REFRESH_SECONDS)
+    
     def log_message(self, direction, agent, message, response=None):
         """Log A2A protocol messages for display"""
-        log_entry = {
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "direction": direction,  # "sent" or "received"
-            "agent": agent,
-            "message": message,
-            "response": response,
-            "id": len(self.message_log) + 1
-        }
-        self.message_log.append(log_entry)
-        
-        # Keep only last 50 messages
-        if len(self.message_log) > 50:
-            self.message_log = self.message_log[-50:]
+        with self._log_lock:
+            log_entry = {
+                "timestamp": time.time(),
+                "direction": direction,  # "sent" or "received"
+                "agent": agent,
+                "message": message,
+                "response": response,
+                "id": len(self.message_log) + 1
+            }
+            self.message_log.append(log_entry)
+    
+    def get_message_log(self):
+        """Snapshot of the message log with display timestamps"""
+        with self._log_lock:
+            entries = list(self.message_log)
+        return [dict(entry, timestamp=_format_hms(int(entry["timestamp"]))) for entry in entries]
+    
+    def clear_message_log(self):
+        """Drop every logged message"""
+        with self._log_lock:
+            self.message_log.clear()
     
     def check_agent_status(self, agent_name, endpoint):
         """Check if an agent is online"""
         try:
-            response = requests.get(f"{endpoint}/health", timeout=1)
+            # Only the status code matters, so skip transferring the body
+            response = self.session.head(f"{endpoint}/health", timeout=HEALTH_CHECK_TIMEOUT_SECONDS,
+                                         allow_redirects=False)
             return agent_name, {
                 "online": response.status_code == 200,
-                "last_check": datetime.now().strftime("%H:%M:%S")
+                "last_check": _now_hms()
             }
         except:
             return agent_name, {
                 "online": False,
-                "last_check": datetime.now().strftime("%H:%M:%S")
+                "last_check": _now_hms()
             }
     
     def check_all_agents_status(self):
         """Check status of all agents concurrently"""
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            # Submit all health checks simultaneously
-            future_to_agent = {
-                executor.submit(self.check_agent_status, name, endpoint): name 
-                for name, endpoint in self.known_agents.items()
-            }
-            
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_agent):
-                agent_name, status = future.result()
-                self.agent_status[agent_name] = status
+        # Submit all health checks simultaneously on the shared workers
+        futures = [
+            self.executor.submit(self.check_agent_status, name, endpoint)
+            for name, endpoint in self.known_agents.items()
+        ]
+        
+        # Collect results as they complete, then publish the whole sweep at once
+        snapshot = dict(self.agent_status)
+        failures = dict(self.probe_failures)
+        for future in concurrent.futures.as_completed(futures):
+            agent_name, status = future.result()
+            snapshot[agent_name] = status
+            failures[agent_name] = 0 if status["online"] else failures.get(agent_name, 0) + 1
+        self.probe_failures = failures
+        self.agent_status = snapshot
+    
+    def is_offline(self, agent_name):
+        """Whether consecutive sweeps found the agent down; one missed probe is not enough"""
+        return self.probe_failures.get(agent_name, 0) >= OFFLINE_AFTER_FAILED_PROBES
+    
+    def offline_error(self, agent_name):
+        """Task error returned instead of calling an agent known to be down"""
+        return {"error": {"code": -32603, "message": f"{agent_name} is offline"}}
+    
+    def discover_all_capabilities(self):
+        """Discover every known agent's capabilities concurrently"""
+        names = list(self.known_agents)
+        return dict(zip(names, self.executor.map(self.discover_capabilities, names)))
     
     def discover_capabilities(self, agent_name):
         """Discover agent capabilities and log the interaction"""
         if agent_name not in self.known_agents:
             return {"error": "Unknown agent"}
         
+        cache_key = f"capabilities:{agent_name}"
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Fail fast rather than wait out the client timeout on a down agent
+        if self.is_offline(agent_name):
+            return {"error": f"{agent_name} is offline"}
+        
         endpoint = self.known_agents[agent_name]
         
         # Log outgoing message
@@ -89,16 +197,19 @@ class A2AWebUI:
         
         # Log response
         if capabilities:
+            cap_names = [cap.name for cap in capabilities.capabilities]
             self.log_message("received", agent_name, "Capabilities discovered", {
                 "name": capabilities.name,
-                "capabilities": [cap.name for cap in capabilities.capabilities]
+                "capabilities": cap_names
             })
-            return {
+            result = {
                 "name": capabilities.name,
                 "description": capabilities.description,
-                "capabilities": [cap.name for cap in capabilities.capabilities],
+                "capabilities": cap_names,
                 "endpoint": capabilities.endpoint
             }
+            self.response_cache.set(cache_key, result, CAPABILITIES_TTL_SECONDS)
+            return result
         else:
             self.log_message("received", agent_name, "Discovery failed", {"error": "No response"})
             return {"error": "Discovery failed"}
@@ -108,6 +219,17 @@ class A2AWebUI:
         if agent_name not in self.known_agents:
             return {"error": "Unknown agent"}
         
+        ttl = CACHEABLE_TASK_TTLS.get(task_type)
+        cache_key = None
+        if ttl is not None:
+            cache_key = f"task:{agent_name}:{task_type}:{json.dumps(task_data, sort_keys=True, default=str)}"
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if self.is_offline(agent_name):
+            return self.offline_error(agent_name)
+        
         endpoint = self.known_agents[agent_name]
         task_id = f"web_task_{int(time.time())}"
         
@@ -140,6 +262,9 @@ class A2AWebUI:
         else:
             self.log_message("received", agent_name, "Task failed", response.get("error"))
         
+        if cache_key is not None and response.get("result", {}).get("status") == "completed":
+            self.response_cache.set(cache_key, response, ttl)
+        
         return response
 
 # Initialize the web UI controller
@@ -152,8 +277,7 @@ def dashboard():
 
 @app.route('/api/agents/status')
 def get_agent_status():
-    """Get status of all known agents"""
-    ui_controller.check_all_agents_status()
+    """Get the latest background status sweep of all known agents"""
     return jsonify(ui_controller.agent_status)
 
 @app.route('/api/agents/<agent_name>/capabilities')
@@ -175,65 +299,41 @@ def send_agent_task(agent_name):
 @app.route('/api/messages')
 def get_message_log():
     """Get recent A2A protocol messages"""
-    return jsonify(ui_controller.message_log)
+    return jsonify(ui_controller.get_message_log())
 
 @app.route('/api/messages/clear', methods=['POST'])
 def clear_message_log():
     """Clear all A2A protocol messages"""
-    ui_controller.message_log.clear()
+    ui_controller.clear_message_log()
     return jsonify({"status": "success", "message": "Message log cleared"})
 
+@app.route('/api/cache/flush', methods=['POST'])
+def flush_response_cache():
+    """Drop cached capability and reference-data responses"""
+    ui_controller.response_cache.clear()
+    return jsonify({"status": "success", "message": "Response cache flushed"})
+
 @app.route('/api/charts/<chart_type>')
 def generate_chart(chart_type):
     """Generate specific chart types"""
+    titles = {
+        "top_holdings": "Top 10 Client Holdings",
+        "pie_chart": "Portfolio Allocation"
+    }
+    if chart_type not in titles:
+        return jsonify({"error": "Unknown chart type"}), 400
+    
     try:
-        # Get sample data for chart generation
-        if chart_type == "top_holdings":
-            # Get client data
-            client_result = ui_controller.send_task("ClientDataAgent", "aggregate_holdings", {})
-            if "error" in client_result:
-                return jsonify({"error": "Failed to get client data"}), 500
-            
-            # Get market data
-            aggregated = client_result["result"]["result"]["aggregated_holdings"]
-            market_result = ui_controller.send_task("FinancialDataAgent", "calculate_market_values", {
-                "aggregated_holdings": aggregated
-            })
-            if "error" in market_result:
-                return jsonify({"error": "Failed to get market data"}), 500
-            
-            # Generate chart
-            holdings = market_result["result"]["result"]["holdings"]
-            chart_result = ui_controller.send_task("ChartGenerationAgent", "generate_top_holdings_chart", {
-                "holdings": holdings,
-                "title": "Top 10 Client Holdings"
-            })
-            
-            return jsonify(chart_result)
-        
-        elif chart_type == "pie_chart":
-            # Similar workflow for pie chart
-            client_result = ui_controller.send_task("ClientDataAgent", "aggregate_holdings", {})
-            if "error" in client_result:
-                return jsonify({"error": "Failed to get client data"}), 500
-            
-            aggregated = client_result["result"]["result"]["aggregated_holdings"]
-            market_result = ui_controller.send_task("FinancialDataAgent", "calculate_market_values", {
-                "aggregated_holdings": aggregated
-            })
-            if "error" in market_result:
-                return jsonify({"error": "Failed to get market data"}), 500
-            
-            holdings = market_result["result"]["result"]["holdings"]
-            chart_result = ui_controller.send_task("ChartGenerationAgent", "generate_portfolio_pie_chart", {
-                "holdings": holdings,
-                "title": "Portfolio Allocation"
-            })
-            
-            return jsonify(chart_result)
+        # Aggregation, valuation and charting run as one pipeline task on the chart agent
+        chart_result = ui_controller.send_task("ChartGenerationAgent", "run_portfolio_pipeline", {
+            "chart_type": chart_type,
+            "title": titles[chart_type],
+            "include_data": False
+        })
+        if "error" in chart_result:
+            return jsonify({"error": "Failed to run portfolio pipeline"}), 500
         
-        else:
-            return jsonify({"error": "Unknown chart type"}), 400
+        return jsonify(chart_result)
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -242,39 +342,16 @@ def generate_chart(chart_type):
 def run_demo(demo_type):
     """Run predefined demo scenarios"""
     if demo_type == "capability_discovery":
-        results = {}
-        for agent_name in ui_controller.known_agents.keys():
-            results[agent_name] = ui_controller.discover_capabilities(agent_name)
+        results = ui_controller.discover_all_capabilities()
         return jsonify({"demo": "capability_discovery", "results": results})
     
     elif demo_type == "portfolio_analysis":
-        # Complete portfolio analysis workflow
-        results = []
-        
-        # Step 1: Get client data
-        client_result = ui_controller.send_task("ClientDataAgent", "aggregate_holdings", {})
-        results.append({"step": "client_data", "result": client_result})
-        
-        if "error" not in client_result and "result" in client_result:
-            aggregated = client_result["result"]["result"]["aggregated_holdings"]
-            
-            # Step 2: Get market data
-            market_result = ui_controller.send_task("FinancialDataAgent", "calculate_market_values", {
-                "aggregated_holdings": aggregated
-            })
-            results.append({"step": "market_data", "result": market_result})
-            
-            if "error" not in market_result and "result" in market_result:
-                holdings = market_result["result"]["result"]["holdings"]
-                
-                # Step 3: Generate chart
-                chart_result = ui_controller.send_task("ChartGenerationAgent", "generate_top_holdings_chart", {
-                    "holdings": holdings,
-                    "title": "Top 10 Client Holdings Portfolio"
-                })
-                results.append({"step": "chart_generation", "result": chart_result})
-        
-        return jsonify({"demo": "portfolio_analysis", "results": results})
+        # Complete portfolio analysis workflow in one pipeline task
+        result = ui_controller.send_task("ChartGenerationAgent", "run_portfolio_pipeline", {
+            "chart_type": "top_holdings",
+            "title": "Top 10 Client Holdings Portfolio"
+        })
+        return jsonify({"demo": "portfolio_analysis", "result": result})
     
     elif demo_type == "data_analysis":
         task_data = {
@@ -301,7 +378,22 @@ def run_demo(demo_type):
     else:
         return jsonify({"error": "Unknown demo type"}), 400
 
+def run_prod(port: int = 5000, threads: int = PROD_THREADS):
+    """Replace this process with gunicorn serving the dashboard from threaded workers"""
+    # One worker keeps the message log, status snapshot and response cache in one place
+    args = ["gunicorn", "-w", "1", "--worker-class", "gthread", "--threads", str(threads),
+            "-b", f"0.0.0.0:{port}", "web_ui:app"]
+    try:
+        os.execvp("gunicorn", args)
+    except FileNotFoundError:
+        print("Warning: gunicorn not installed, falling back to the Flask development server")
+        app.run(host='0.0.0.0', port=port, threaded=True)
+
 if __name__ == '__main__':
     print("Starting A2A Protocol Web UI...")
     print("Dashboard available at: http://localhost:5000")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if "--prod" in sys.argv:
+        run_prod()
+    else:
+        # Debug mode and the reloader only when DEV is explicitly enabled
+        app.run(host='0.0.0.0', port=5000, debug=DEV_MODE, threaded=True)
\ No newline at end of file